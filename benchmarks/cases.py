@@ -0,0 +1,352 @@
+"""
+Benchmark cases with pinned inputs.
+
+Each case is a setup function registered with `@case`. It receives the
+parameters of the selected scale and returns the zero-argument callable
+that gets timed. Inputs come from a seeded RNG, so they are identical on
+every run and every commit.
+"""
+
+import random
+import string
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+SEED = 1234
+
+SCALES: dict[str, dict[str, dict]] = {
+    "dynamic.build": {
+        "small": {"template_bytes": 256, "n_vars": 2},
+        "medium": {"template_bytes": 4096, "n_vars": 10},
+        "large": {"template_bytes": 65536, "n_vars": 40},
+    },
+    "ensemble.build": {
+        "small": {"n_templates": 8},
+        "medium": {"n_templates": 80},
+        "large": {"n_templates": 800},
+    },
+    "ensemble.build_many": {
+        "small": {"n_rows": 1_000, "n_templates": 8},
+        "medium": {"n_rows": 100_000, "n_templates": 8},
+        "large": {"n_rows": 1_000_000, "n_templates": 4},
+    },
+    "turbo.build": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "turbo.next_turn": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "turbo.add_raw_content": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "turbo.add_raw_content.trusted": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "turbo.from_settings": {
+        "small": {"n_examples": 2},
+        "medium": {"n_examples": 20},
+        "large": {"n_examples": 200},
+    },
+    "turbo.from_settings.trusted": {
+        "small": {"n_examples": 2},
+        "medium": {"n_examples": 20},
+        "large": {"n_examples": 200},
+    },
+    "turbo.restore": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "turbo.restore.json": {
+        "small": {"n_messages": 10},
+        "medium": {"n_messages": 1_000},
+        "large": {"n_messages": 10_000},
+    },
+    "from_file.cached": {
+        "small": {"files": ["sample.prompt.yaml"]},
+        "medium": {"files": ["sample.prompt.yaml", "turbo.prompt.yaml"]},
+        "large": {
+            "files": [
+                "sample.prompt.yaml",
+                "turbo.prompt.yaml",
+                "sample.past.yaml",
+                "complex.yaml",
+            ]
+        },
+    },
+    "from_file.uncached": {
+        "small": {"files": ["sample.prompt.yaml"]},
+        "medium": {"files": ["sample.prompt.yaml", "turbo.prompt.yaml"]},
+        "large": {
+            "files": [
+                "sample.prompt.yaml",
+                "turbo.prompt.yaml",
+                "sample.past.yaml",
+                "complex.yaml",
+            ]
+        },
+    },
+    "import": {
+        "small": {},
+        "medium": {},
+        "large": {},
+    },
+}
+
+CASES: dict[str, Callable[..., Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup: Callable[..., Callable[[], object]]):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def random_words(rng: random.Random, n_words: int) -> list[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(n_words)
+    ]
+
+
+def make_template(rng: random.Random, template_bytes: int, n_vars: int) -> str:
+    """Text of about `template_bytes` characters with `n_vars` evenly spread slots."""
+    words = random_words(rng, template_bytes // 6 + 1)
+    text = " ".join(words)[:template_bytes]
+    step = max(1, len(text) // (n_vars + 1))
+    pieces = []
+    for i in range(n_vars):
+        pieces.append(text[i * step : (i + 1) * step])
+        pieces.append(f"<var{i}>")
+    pieces.append(text[n_vars * step :])
+    return "".join(pieces)
+
+
+def make_ensemble_templates(rng: random.Random, n_templates: int) -> list[str]:
+    templates = []
+    for i in range(n_templates):
+        prefix, suffix = random_words(rng, 2)
+        templates.append(f"{prefix} <label> #{i}, a kind of <superclass> {suffix}")
+    return templates
+
+
+@case("dynamic.build")
+def dynamic_build(template_bytes: int, n_vars: int):
+    from prompts import DynamicPrompt
+
+    rng = random.Random(SEED)
+    prompt = DynamicPrompt(make_template(rng, template_bytes, n_vars))
+    values = {f"var{i}": word for i, word in enumerate(random_words(rng, n_vars))}
+    return lambda: prompt.build(**values)
+
+
+@case("ensemble.build")
+def ensemble_build(n_templates: int):
+    from prompts.ensemble import PromptEnsemble
+
+    rng = random.Random(SEED)
+    templates = make_ensemble_templates(rng, n_templates)
+    ensemble = PromptEnsemble(templates, ["label", "superclass"])
+    return lambda: ensemble.build(label="dog", superclass="animal")
+
+
+@case("ensemble.build_many")
+def ensemble_build_many(n_rows: int, n_templates: int):
+    from prompts.ensemble import PromptEnsemble
+
+    rng = random.Random(SEED)
+    templates = make_ensemble_templates(rng, n_templates)
+    ensemble = PromptEnsemble(templates, ["label", "superclass"])
+    labels = random_words(rng, n_rows)
+    superclasses = random_words(rng, n_rows)
+    return lambda: ensemble.build_many(label=labels, superclass=superclasses)
+
+
+def make_conversation(n_messages: int):
+    from prompts import TurboPrompt
+
+    rng = random.Random(SEED)
+    tp = TurboPrompt.from_file(str(ROOT / "samples" / "turbo.prompt.yaml"))
+    tp.add_system_message()
+    for i in range(n_messages - 1):
+        message = " ".join(random_words(rng, 20))
+        if i % 2 == 0:
+            tp.add_user_message(user_name="user", message=message)
+        else:
+            tp.add_assistant_message(message=message)
+    return tp
+
+
+@case("turbo.build")
+def turbo_build(n_messages: int):
+    tp = make_conversation(n_messages)
+    return tp.build
+
+
+@case("turbo.next_turn")
+def turbo_next_turn(n_messages: int):
+    tp = make_conversation(n_messages)
+
+    def add_and_build():
+        branch = tp.fork()
+        branch.add_user_message(user_name="user", message="one more question")
+        return branch.build()
+
+    return add_and_build
+
+
+def make_raw_messages(n_messages: int) -> list[dict]:
+    rng = random.Random(SEED)
+    roles = ["user", "assistant"]
+    return [
+        {"role": roles[i % 2], "content": " ".join(random_words(rng, 20))}
+        for i in range(n_messages)
+    ]
+
+
+def raw_content(n_messages: int, trusted: bool):
+    from prompts import TurboPrompt
+
+    messages = make_raw_messages(n_messages)
+
+    def add_all():
+        tp = TurboPrompt()
+        for message in messages:
+            tp.add_raw_content(message, trusted=trusted)
+        return tp
+
+    return add_all
+
+
+@case("turbo.add_raw_content")
+def turbo_add_raw_content(n_messages: int):
+    return raw_content(n_messages, trusted=False)
+
+
+@case("turbo.add_raw_content.trusted")
+def turbo_add_raw_content_trusted(n_messages: int):
+    return raw_content(n_messages, trusted=True)
+
+
+def from_settings(n_examples: int, trusted: bool):
+    from prompts import ChatMLMessage, OpenAIModelSettings, TurboPrompt
+
+    examples = [ChatMLMessage(**message) for message in make_raw_messages(n_examples)]
+    settings = OpenAIModelSettings(model="gpt-4")
+
+    def load():
+        return TurboPrompt.from_settings(
+            name="bench",
+            description="",
+            settings=settings,
+            initial_template_data=examples,
+            system_template="<message>",
+            user_template="Q: <message>",
+            assistant_template="A: <message>",
+            trusted=trusted,
+        )
+
+    return load
+
+
+@case("turbo.from_settings")
+def turbo_from_settings(n_examples: int):
+    return from_settings(n_examples, trusted=False)
+
+
+@case("turbo.from_settings.trusted")
+def turbo_from_settings_trusted(n_examples: int):
+    return from_settings(n_examples, trusted=True)
+
+
+@case("turbo.restore")
+def turbo_restore(n_messages: int):
+    from prompts import TurboPrompt
+    from prompts.snapshot import dump_snapshot, restore
+
+    data = dump_snapshot(make_conversation(n_messages))
+    source = TurboPrompt.from_file(str(ROOT / "samples" / "turbo.prompt.yaml"))
+    return lambda: restore(data, source)
+
+
+@case("turbo.restore.json")
+def turbo_restore_json(n_messages: int):
+    import json
+
+    from prompts import TurboPrompt
+
+    data = json.dumps(make_conversation(n_messages).build())
+    path = str(ROOT / "samples" / "turbo.prompt.yaml")
+
+    def restore():
+        tp = TurboPrompt.from_file(path)
+        for message in json.loads(data):
+            tp.add_raw_content(message)
+        return tp
+
+    return restore
+
+
+@case("from_file.cached")
+def from_file_cached(files: list[str]):
+    from prompts import DynamicPrompt, TurboPrompt
+
+    paths = [str(ROOT / "samples" / name) for name in files]
+    loaders = [
+        (
+            DynamicPrompt.from_file
+            if name.startswith("sample.prompt")
+            else TurboPrompt.from_file
+        )
+        for name in files
+    ]
+
+    def load_all():
+        for loader, path in zip(loaders, paths):
+            loader(path)
+
+    return load_all
+
+
+@case("from_file.uncached")
+def from_file_uncached(files: list[str]):
+    from prompts import DynamicPrompt, TurboPrompt
+
+    paths = [str(ROOT / "samples" / name) for name in files]
+    loaders = [
+        (
+            DynamicPrompt.from_file
+            if name.startswith("sample.prompt")
+            else TurboPrompt.from_file
+        )
+        for name in files
+    ]
+
+    def load_all():
+        for loader, path in zip(loaders, paths):
+            loader(path, cache=False)
+
+    return load_all
+
+
+@case("import")
+def import_prompts():
+    command = [
+        sys.executable,
+        "-c",
+        "import prompts; prompts.DynamicPrompt('<a>').build(a='b')",
+    ]
+    return lambda: subprocess.run(command, check=True, cwd=ROOT)
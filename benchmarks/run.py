@@ -0,0 +1,168 @@
+"""
+Run the benchmark suite, or compare two result files.
+
+    python benchmarks/run.py --scale small --output before.json
+    python benchmarks/run.py --scale small --output after.json
+    python benchmarks/run.py compare before.json after.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cases import CASES, ROOT, SCALES  # noqa: E402
+
+# Each repeat runs the callable enough times to last at least this long.
+MIN_REPEAT_SECONDS = 0.2
+
+
+def time_callable(fn, repeat: int) -> dict:
+    fn()  # warm up caches and lazy imports
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_SECONDS:
+            break
+        if elapsed < MIN_REPEAT_SECONDS / 100:
+            number *= 10
+        else:
+            number = math.ceil(number * MIN_REPEAT_SECONDS / elapsed)
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def run(scale: str, names: list[str], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        params = SCALES[name][scale]
+        fn = CASES[name](**params)
+        result = time_callable(fn, repeat)
+        result["params"] = params
+        results[name] = result
+        print(f"{name:<28} {result['min'] * 1e6:>14.2f} us", file=sys.stderr)
+
+    return {
+        "meta": {
+            "scale": scale,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(before: dict, after: dict, threshold: float) -> bool:
+    """Print min-time ratios and return whether any case got slower."""
+    regressed = False
+    print(f"{'case':<28} {'before':>12} {'after':>12} {'ratio':>8}")
+    for name, result in after["results"].items():
+        if name not in before["results"]:
+            continue
+        old = before["results"][name]["min"]
+        new = result["min"]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressed = True
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(
+            f"{name:<28} {old * 1e6:>10.2f}us {new * 1e6:>10.2f}us {ratio:>8.2f}{flag}"
+        )
+    return regressed
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks (default)")
+    compare_parser = subparsers.add_parser("compare", help="compare two results")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="relative change to report"
+    )
+    parser.set_defaults(scale="small", repeat=5, output=None, filters=None)
+    # accepted before or after `run`; SUPPRESS keeps the subparser from
+    # overwriting values given before it
+    for p in (parser, run_parser):
+        p.add_argument(
+            "--scale", choices=["small", "medium", "large"], default=argparse.SUPPRESS
+        )
+        p.add_argument("--repeat", type=int, default=argparse.SUPPRESS)
+        p.add_argument(
+            "--output", default=argparse.SUPPRESS, help="JSON file for the results"
+        )
+        p.add_argument(
+            "-k",
+            dest="filters",
+            action="append",
+            default=argparse.SUPPRESS,
+            help="only run cases containing this",
+        )
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        sys.exit(1 if compare(before, after, args.threshold) else 0)
+
+    names = [
+        name
+        for name in CASES
+        if not args.filters or any(f in name for f in args.filters)
+    ]
+    report = run(args.scale, names, args.repeat)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
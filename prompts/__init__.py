@@ -1,11 +1,72 @@
-from .dynamic import DynamicPrompt
-from .schemas import (
-    DynamicSchema,
-    OpenAIModelSettings,
-    PromptRole,
-    Template,
-    ChatMLMessage,
-    TemplateInputs,
-    TurboSchema,
-)
-from .turbo import TurboPrompt
+"""
+Public names are resolved lazily, so `import prompts` stays cheap: pydantic
+and PyYAML are only imported once settings, schemas or files are used.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_LAZY_ATTRS = {
+    "DynamicPrompt": "dynamic",
+    "DynamicSchema": "schemas",
+    "OpenAIModelSettings": "schemas",
+    "PromptRole": "schemas",
+    "Template": "schemas",
+    "ChatMLMessage": "schemas",
+    "TemplateInputs": "schemas",
+    "TurboSchema": "schemas",
+    "TurboPrompt": "turbo",
+    "TurboTemplates": "turbo",
+    "TurboConversation": "turbo",
+}
+_SUBMODULES = {
+    "aio",
+    "bundle",
+    "cache",
+    "dynamic",
+    "embeddings",
+    "ensemble",
+    "exceptions",
+    "loader",
+    "messages",
+    "metrics",
+    "registry",
+    "schemas",
+    "snapshot",
+    "template",
+    "tokens",
+    "turbo",
+    "utils",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(f".{_LAZY_ATTRS[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
+
+
+if TYPE_CHECKING:
+    from .dynamic import DynamicPrompt
+    from .schemas import (
+        ChatMLMessage,
+        DynamicSchema,
+        OpenAIModelSettings,
+        PromptRole,
+        Template,
+        TemplateInputs,
+        TurboSchema,
+    )
+    from .turbo import TurboConversation, TurboPrompt, TurboTemplates
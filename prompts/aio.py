@@ -0,0 +1,131 @@
+"""
+Asyncio helpers to render prompts from a stream of inputs.
+
+Small renders run inline on the event loop; batches of at least
+`offload_threshold` prompts run in an executor (the default thread pool, or
+any `concurrent.futures` executor such as a process pool) so a big
+`build_many` never blocks the loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Mapping
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Union
+
+from .dynamic import DynamicPrompt
+from .ensemble import PromptEnsemble
+from .turbo import TurboPrompt, TurboTemplates
+
+Renderable = Union[DynamicPrompt, PromptEnsemble, TurboPrompt, TurboTemplates]
+
+
+def render(prompt: Renderable, inputs: Mapping[str, Any]) -> Any:
+    """
+    Render one input dict with `prompt`.
+
+    - `DynamicPrompt`: `prompt.build(**inputs)`.
+    - `PromptEnsemble`: `build_many` when inputs hold columns, else `build`.
+    - `TurboPrompt`: adds `inputs` as a user message to a fork of the
+      conversation and returns its messages; `prompt` is left untouched.
+    - `TurboTemplates`: the same, on a new conversation.
+    """
+    if isinstance(prompt, TurboPrompt):
+        conversation = prompt.fork()
+        conversation.add_user_message(**inputs)
+        return conversation.build()
+    if isinstance(prompt, TurboTemplates):
+        conversation = prompt.conversation()
+        conversation.add_user_message(**inputs)
+        return conversation.build()
+    if isinstance(prompt, PromptEnsemble) and _is_columns(inputs):
+        return prompt.build_many(**inputs)
+    return prompt.build(**inputs)
+
+
+async def abuild(
+    prompt: Renderable,
+    inputs: AsyncIterable[Mapping[str, Any]] | Iterable[Mapping[str, Any]],
+    concurrency: int = 4,
+    executor: Executor | None = None,
+    offload_threshold: int = 10_000,
+) -> AsyncIterator[Any]:
+    """
+    Render every input dict and yield the results in input order.
+
+    At most `concurrency` renders are in flight, and the next input is only
+    pulled once a slot frees up, so a slow consumer slows the producer down.
+
+    Example:
+    ```
+        async for prompts in abuild(ensemble, queue_reader(), concurrency=8):
+            await publish(prompts)
+    ```
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}.")
+
+    loop = asyncio.get_running_loop()
+    pending: deque[asyncio.Future] = deque()
+    try:
+        async for item in _aiter(inputs):
+            if _size(prompt, item) >= offload_threshold:
+                future = loop.run_in_executor(executor, partial(render, prompt, item))
+            else:
+                future = loop.create_future()
+                try:
+                    future.set_result(render(prompt, item))
+                except Exception as e:
+                    future.set_exception(e)
+            pending.append(future)
+
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def abuild_many(
+    ensemble: PromptEnsemble,
+    executor: Executor | None = None,
+    **kwargs,
+) -> list:
+    """Run `ensemble.build_many` in an executor, without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(ensemble.build_many, **kwargs))
+
+
+async def _aiter(inputs) -> AsyncIterator:
+    if isinstance(inputs, AsyncIterable):
+        async for item in inputs:
+            yield item
+    else:
+        for item in inputs:
+            yield item
+
+
+def _is_columns(inputs: Mapping[str, Any]) -> bool:
+    return any(
+        hasattr(value, "__len__") and not isinstance(value, str)
+        for value in inputs.values()
+    )
+
+
+def _size(prompt: Renderable, inputs: Mapping[str, Any]) -> int:
+    """Number of prompts rendering `inputs` produces."""
+    if not isinstance(prompt, PromptEnsemble):
+        return 1
+    if not _is_columns(inputs):
+        return len(prompt)
+    n_rows = max(
+        len(value)
+        for value in inputs.values()
+        if hasattr(value, "__len__") and not isinstance(value, str)
+    )
+    return n_rows * len(prompt)
@@ -0,0 +1,152 @@
+"""
+Precompiled prompt bundles.
+
+A bundle packs a directory of prompt files into one binary file holding the
+validated schemas and the prompts built from them (compiled templates and
+rendered initial messages included). Loading memory-maps the file and only
+deserializes an entry the first time it is requested, so processes start
+without parsing YAML or running pydantic validation, and share the pages.
+
+Entries are pickled: only load bundles you built yourself.
+
+Layout: a fixed header (magic, version, index offset and length), the
+entry blobs, then a pickled index mapping each prompt name to its kind and
+the offsets of its schema and prompt blobs.
+"""
+
+import argparse
+import mmap
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Iterator
+
+from .dynamic import DynamicPrompt
+from .exceptions import DuplicatePromptNameError
+from .schemas import DynamicSchema, TurboSchema, prompt_from_data
+from .turbo import TurboPrompt
+from .utils import find_prompt_files, load_yaml
+
+MAGIC = b"PRMPTBND"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQ")
+
+
+def build_bundle(source_dir: str | os.PathLike, output: str | os.PathLike) -> int:
+    """
+    Compile every prompt file under `source_dir` into the bundle `output`.
+
+    Returns the number of prompts written.
+    """
+    paths = find_prompt_files(source_dir)
+    index: dict[str, tuple[str, int, int, int, int]] = {}
+    sources: dict[str, Path] = {}
+    with open(output, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        for path in paths:
+            schema, prompt = prompt_from_data(load_yaml(str(path)))
+            if schema.name in sources:
+                raise DuplicatePromptNameError(
+                    f"Prompt {schema.name!r} is defined in both "
+                    f"{sources[schema.name]} and {path}"
+                )
+            sources[schema.name] = path
+
+            kind = "dynamic" if isinstance(schema, DynamicSchema) else "turbo"
+            schema_offset = f.tell()
+            schema_length = f.write(pickle.dumps(schema, pickle.HIGHEST_PROTOCOL))
+            prompt_offset = f.tell()
+            prompt_length = f.write(pickle.dumps(prompt, pickle.HIGHEST_PROTOCOL))
+            index[schema.name] = (
+                kind,
+                schema_offset,
+                schema_length,
+                prompt_offset,
+                prompt_length,
+            )
+
+        index_offset = f.tell()
+        index_length = f.write(pickle.dumps(index, pickle.HIGHEST_PROTOCOL))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, index_offset, index_length))
+    return len(index)
+
+
+class PromptBundle:
+    """
+    Read-only view over a bundle written by `build_bundle`.
+
+    >>> bundle = PromptBundle("prompts.bundle")  # doctest: +SKIP
+    >>> prompt = bundle["basic_turbo_prompt"]  # doctest: +SKIP
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a prompt bundle")
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a prompt bundle")
+        if version != VERSION:
+            raise ValueError(f"Unsupported prompt bundle version {version}")
+        self._index: dict[str, tuple[str, int, int, int, int]] = pickle.loads(
+            self._buffer[index_offset : index_offset + index_length]
+        )
+        self._schemas: dict[str, DynamicSchema | TurboSchema] = {}
+
+    def schema(self, name: str) -> DynamicSchema | TurboSchema:
+        """Return the validated schema of `name`, deserialized once."""
+        schema = self._schemas.get(name)
+        if schema is None:
+            _, offset, length, _, _ = self._index[name]
+            schema = pickle.loads(self._buffer[offset : offset + length])
+            self._schemas[name] = schema
+        return schema
+
+    def load(self, name: str) -> DynamicPrompt | TurboPrompt:
+        """Return a fresh prompt object for `name`."""
+        _, _, _, offset, length = self._index[name]
+        return pickle.loads(self._buffer[offset : offset + length])
+
+    def kind(self, name: str) -> str:
+        return self._index[name][0]
+
+    def __getitem__(self, name: str) -> DynamicPrompt | TurboPrompt:
+        return self.load(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self) -> "PromptBundle":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Compile a directory of prompt files into a bundle."
+    )
+    parser.add_argument("source_dir")
+    parser.add_argument("output")
+    args = parser.parse_args(argv)
+    n_prompts = build_bundle(args.source_dir, args.output)
+    print(f"Wrote {n_prompts} prompts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
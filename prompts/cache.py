@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Hashable, NamedTuple, Type, TypeVar
+
+from .utils import load_yaml
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+SchemaT = TypeVar("SchemaT", bound="BaseModel")
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class LRUCache:
+    """Thread-safe bounded LRU mapping that counts hits, misses and evictions."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SchemaCache(LRUCache):
+    """
+    Bounded LRU cache of parsed and validated prompt schemas.
+
+    Entries are keyed by absolute path and schema class, and are reloaded
+    whenever the file's modification time or size changes. Cached schemas are
+    shared, so callers must treat them as read-only.
+    """
+
+    def load(self, path: str | os.PathLike, schema_class: Type[SchemaT]) -> SchemaT:
+        return self._load(path, schema_class, with_hash=False)[0]
+
+    def load_hashed(
+        self, path: str | os.PathLike, schema_class: Type[SchemaT]
+    ) -> tuple[SchemaT, bytes]:
+        """
+        Like `load`, also returning the schema's `schema_hash`.
+
+        The hash is computed once per loaded version of the file: cached
+        schemas are never modified, so it stays valid as long as the entry.
+        """
+        return self._load(path, schema_class, with_hash=True)
+
+    def _load(
+        self, path: str | os.PathLike, schema_class: Type[SchemaT], with_hash: bool
+    ) -> tuple[SchemaT, bytes | None]:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = (path, schema_class)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                _, schema, digest = entry
+                if digest is not None or not with_hash:
+                    return schema, digest
+            else:
+                self.misses += 1
+                schema = None
+
+        if schema is None:
+            schema = schema_class(**load_yaml(path))
+        digest = content_hash(schema) if with_hash else None
+        self.put(key, (version, schema, digest))
+        return schema, digest
+
+
+def content_hash(schema: "BaseModel") -> bytes:
+    """Content hash of a schema, from its JSON serialization."""
+    return hashlib.blake2b(schema.model_dump_json().encode(), digest_size=16).digest()
+
+
+schema_cache = SchemaCache()
+# Rendered `initial_template_data` messages, keyed by prompt class and schema hash
+initial_messages_cache = LRUCache()
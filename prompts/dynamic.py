@@ -1,10 +1,14 @@
-from typing import TYPE_CHECKING
+from __future__ import annotations
 
+from typing import IO, TYPE_CHECKING, Iterable, Sequence
+
+from . import metrics
 from .exceptions import UndefinedVariableError
-from .schemas import DynamicSchema, OpenAIModelSettings
-from .utils import load_yaml
+from .template import compile_template
 
 if TYPE_CHECKING:
+    # pydantic and yaml are only imported once settings or files are used
+    from .schemas import DynamicSchema, OpenAIModelSettings
     from .turbo import TurboPrompt
 
 
@@ -32,34 +36,161 @@ class DynamicPrompt:
 
         self.template = template
 
+        if template_vars is None:
+            template_vars = list(self._compiled.variables)
         self.template_vars = template_vars
 
         if isinstance(settings, dict):
+            from .schemas import OpenAIModelSettings
+
             settings = OpenAIModelSettings(**settings)
 
         self.settings: OpenAIModelSettings | None = settings
 
+    @property
+    def template(self) -> str:
+        return self._compiled.source
+
+    @template.setter
+    def template(self, template: str):
+        self._compiled = compile_template(template)
+
     def build(self, strict=True, **kwargs):
-        prompt = self.template
-        for var, value in kwargs.items():
-            pattern = f"<{var}>"
-            if pattern not in prompt and strict:
+        if metrics.sink is not None:
+            return metrics.observe(
+                "dynamic.build", self.name, self._build, strict, kwargs, size=len
+            )
+        if strict:
+            self._check_vars(kwargs)
+        return self._compiled.render(kwargs)
+
+    def _build(self, strict: bool, kwargs: dict[str, str]) -> str:
+        if strict:
+            self._check_vars(kwargs)
+        return self._compiled.render(kwargs)
+
+    def render_into(
+        self, writer: IO, strict=True, encoding: str | None = None, **kwargs
+    ) -> int:
+        """
+        Like `build`, but write the prompt to a text or binary stream.
+
+        Literal segments and values are written one at a time, so the whole
+        prompt is never assembled in memory. Use it to stream large prompts
+        into files, io buffers or sockets (`sock.makefile("wb")`).
+        Returns the number of characters (or bytes) written.
+
+        >>> import io
+        >>> buffer = io.StringIO()
+        >>> DynamicPrompt("a photo of a <label>").render_into(buffer, label="dog")
+        16
+        >>> buffer.getvalue()
+        'a photo of a dog'
+        """
+        if metrics.sink is not None:
+            return metrics.observe(
+                "dynamic.render_into",
+                self.name,
+                self._render_into,
+                writer,
+                strict,
+                encoding,
+                kwargs,
+                size=int,
+            )
+        return self._render_into(writer, strict, encoding, kwargs)
+
+    def _render_into(
+        self,
+        writer: IO,
+        strict: bool,
+        encoding: str | None,
+        kwargs: dict[str, str],
+    ) -> int:
+        if strict:
+            self._check_vars(kwargs)
+        return self._compiled.render_into(kwargs, writer, encoding)
+
+    def build_column(self, strict=True, **columns: Sequence[str]) -> list[str]:
+        """
+        Build one prompt per row from equal-length columns of values.
+
+        >>> prompt = DynamicPrompt("a photo of a <label>")
+        >>> prompt.build_column(label=["dog", "cat"])
+        ['a photo of a dog', 'a photo of a cat']
+        """
+        if strict:
+            self._check_vars(columns)
+        n_rows = len(next(iter(columns.values()), ()))
+        return self._compiled.render_columns(columns, n_rows)
+
+    def partial(self, strict=True, **kwargs) -> DynamicPrompt:
+        """
+        Return a copy with the given variables bound for good.
+
+        Bound values become literal text of the new prompt's template, so
+        each `build` only fills the remaining variables.
+
+        >>> prompt = DynamicPrompt("<persona>: translate <text> to <language>")
+        >>> french = prompt.partial(persona="Translator", language="French")
+        >>> french.template_vars
+        ['text']
+        >>> french.build(text="hello")
+        'Translator: translate hello to French'
+        """
+        if strict:
+            self._check_vars(kwargs)
+        prompt = self.__class__.__new__(self.__class__)
+        prompt.__dict__.update(self.__dict__)
+        prompt._compiled = self._compiled.partial(kwargs)
+        prompt.template_vars = [var for var in self.template_vars if var not in kwargs]
+        return prompt
+
+    def _check_vars(self, var_names: Iterable[str]):
+        names = self._compiled.names
+        for var in var_names:
+            if var not in names:
                 raise UndefinedVariableError(
                     message=f"Variable {var} was not found in prompt (expected vars={self.template_vars})."
                 )
-            prompt = prompt.replace(pattern, value)
-        return prompt
 
-    def to_turbo(self) -> "TurboPrompt":
+    def to_turbo(self) -> TurboPrompt:
         from .turbo import TurboPrompt
 
         return TurboPrompt(system_templates=self)
 
     @classmethod
-    def from_file(cls, prompt_file: str) -> "DynamicPrompt":
-        prompt = load_yaml(prompt_file)
-        schema = DynamicSchema(**prompt)
-        return cls(**schema.dict())
+    def from_file(cls, prompt_file: str, cache: bool = True) -> DynamicPrompt:
+        if metrics.sink is not None:
+            return metrics.observe(
+                "dynamic.from_file",
+                str(prompt_file),
+                cls._from_file,
+                prompt_file,
+                cache,
+            )
+        return cls._from_file(prompt_file, cache)
+
+    @classmethod
+    def _from_file(cls, prompt_file: str, cache: bool) -> DynamicPrompt:
+        from .cache import schema_cache
+        from .schemas import DynamicSchema
+        from .utils import load_yaml
+
+        if not cache:
+            prompt = load_yaml(prompt_file)
+            return cls.from_schema(DynamicSchema(**prompt))
+
+        return cls.from_schema(schema_cache.load(prompt_file, DynamicSchema))
+
+    @classmethod
+    def from_schema(cls, prompt_schema: DynamicSchema) -> DynamicPrompt:
+        return cls(
+            name=prompt_schema.name,
+            description=prompt_schema.description,
+            template=prompt_schema.template,
+            settings=prompt_schema.settings.model_copy(),
+        )
 
     def __repr__(self) -> str:
         return (
@@ -0,0 +1,205 @@
+"""
+Class embeddings from a `PromptEnsemble` and a batch text encoder.
+
+This is the usual zero-shot classification recipe (e.g. CLIP): render every
+template for every label, encode the prompts and average them per label.
+Rows are rendered and encoded in chunks, so memory is bounded by the chunk
+rather than the whole (rows x templates) grid. Each distinct prompt is
+encoded once, in fixed-size batches, and remembered in an `EmbeddingCache`
+across calls.
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import dbm
+import hashlib
+import os
+import pickle
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from .cache import LRUCache
+from .ensemble import PromptEnsemble, _as_columns, _chunked
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Takes a batch of prompts and returns one vector per prompt, e.g. an array
+# shaped (len(batch), dim).
+BatchEncoder = Callable[[list[str]], Any]
+
+_MISSING = object()
+
+
+class EmbeddingCache(LRUCache):
+    """
+    Bounded LRU cache of embeddings keyed by prompt string.
+
+    With `path`, every embedding is also written to a `dbm` database there,
+    so entries evicted from memory, or computed by a previous process, are
+    read back instead of being encoded again. `clear` only empties memory.
+    """
+
+    def __init__(self, maxsize: int = 10_000, path: str | os.PathLike | None = None):
+        super().__init__(maxsize)
+        self.path = path
+        self._store = None if path is None else dbm.open(os.fspath(path), "c")
+        self._store_lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = super().get(key, _MISSING)
+        if value is _MISSING and self._store is not None:
+            with self._store_lock:
+                data = self._store.get(_store_key(key))
+            if data is not None:
+                value = pickle.loads(data)
+                super().put(key, value)
+        return default if value is _MISSING else value
+
+    def put(self, key: str, value: Any):
+        super().put(key, value)
+        if self._store is not None:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._store_lock:
+                self._store[_store_key(key)] = data
+
+    def close(self):
+        if self._store is not None:
+            with self._store_lock:
+                self._store.close()
+                self._store = None
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _store_key(prompt: str) -> bytes:
+    return hashlib.sha256(prompt.encode()).digest()
+
+
+class EnsembleEncoder:
+    def __init__(
+        self,
+        ensemble: PromptEnsemble,
+        encoder: BatchEncoder,
+        batch_size: int = 256,
+        cache: EmbeddingCache | None = None,
+        normalize: bool = False,
+        chunk_size: int = 4096,
+    ):
+        """
+        Args:
+            ensemble: templates rendered for every row
+            encoder: maps a list of at most `batch_size` prompts to their vectors
+            batch_size: number of prompts per encoder call
+            cache: embeddings by prompt, a new in-memory cache by default
+            normalize: L2-normalize prompt embeddings before averaging them,
+                and the averages themselves, as CLIP does
+            chunk_size: number of rows rendered and encoded at a time, which
+                bounds the prompts held in memory
+
+        Examples:
+        >>> import numpy as np
+        >>> ensemble = PromptEnsemble(["<label>", "a photo of a <label>"], ["label"])
+        >>> encode = lambda batch: np.array([[len(p), 1.0] for p in batch])
+        >>> EnsembleEncoder(ensemble, encode).encode(label=["dog", "cat"])
+        array([[9.5, 1. ],
+               [9.5, 1. ]])
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}.")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+
+        self.ensemble = ensemble
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.cache = EmbeddingCache() if cache is None else cache
+        self.normalize = normalize
+        self.chunk_size = chunk_size
+
+    def encode(self, **kwargs) -> "np.ndarray":
+        """
+        Embed every row, averaging over templates.
+
+        Takes the same arguments as `PromptEnsemble.build_many` and returns
+        an array shaped (n_rows, dim). Rows are rendered `chunk_size` at a
+        time, and each chunk's distinct prompts are encoded and added to the
+        row averages before the next chunk is rendered.
+
+        Example:
+        ```
+            class_embeddings = encode(label=['dog', 'cat', 't-shirt'])
+            logits = image_embeddings @ class_embeddings.T
+        ```
+        """
+        import numpy as np
+
+        strict = kwargs.pop("strict", False)
+        columns, n_rows = _as_columns(kwargs)
+        n_templates = len(self.ensemble)
+        if n_rows == 0 or n_templates == 0:
+            return np.empty((n_rows, 0))
+
+        embeddings = None
+        for start in range(0, n_rows, self.chunk_size):
+            stop = min(start + self.chunk_size, n_rows)
+            chunk = {name: column[start:stop] for name, column in columns.items()}
+            grid = self.ensemble.build_grid(strict=strict, **chunk)
+            unique, index = grid.unique()
+
+            vectors = self.encode_prompts(unique)
+            if self.normalize:
+                vectors = _l2_normalize(vectors)
+            if embeddings is None:
+                dtype = np.result_type(vectors, np.float32)
+                embeddings = np.zeros((n_rows, vectors.shape[1]), dtype=dtype)
+
+            # sum one template at a time, never holding (rows, n_templates, dim)
+            index = np.asarray(index, dtype=np.intp)
+            rows = embeddings[start:stop]
+            for template in range(n_templates):
+                rows += vectors[index[:, template]]
+
+        embeddings /= n_templates
+        if self.normalize:
+            embeddings = _l2_normalize(embeddings)
+        return embeddings
+
+    def encode_prompts(self, prompts: Sequence[str]) -> "np.ndarray":
+        """Embed `prompts`, calling the encoder only for uncached ones."""
+        import numpy as np
+
+        vectors = {}
+        missing = []
+        for prompt in prompts:
+            vector = self.cache.get(prompt)
+            if vector is None:
+                missing.append(prompt)
+            else:
+                vectors[prompt] = vector
+
+        for batch in _chunked(iter(missing), self.batch_size):
+            encoded = np.asarray(self.encoder(batch))
+            if len(encoded) != len(batch):
+                raise ValueError(
+                    f"Encoder returned {len(encoded)} vectors "
+                    f"for a batch of {len(batch)} prompts."
+                )
+            for prompt, vector in zip(batch, encoded):
+                self.cache.put(prompt, vector)
+                vectors[prompt] = vector
+
+        return np.stack([vectors[prompt] for prompt in prompts])
+
+
+def _l2_normalize(vectors: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
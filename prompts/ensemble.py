@@ -1,23 +1,39 @@
 from __future__ import annotations
 
-from typing import Optional, Type
+from collections.abc import Sequence as SequenceABC
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from math import prod
+from typing import Any, Iterator, Optional, Sequence, Type
 
+from . import metrics
 from .dynamic import DynamicPrompt
 from .exceptions import ArgumentNumberOfElementsError, ExpectedVarsArgumentError
 
 
 class PromptEnsemble:
+    # Smallest batch (rows x templates) worth sending to a process pool.
+    parallel_threshold = 100_000
+    chunks_per_worker = 4
+
     def __init__(
         self,
         templates: list[str],
         expected_vars: Optional[list[str]] = None,
         prompt_class: Type[DynamicPrompt] = DynamicPrompt,
+        name: str = "",
+        workers: int | None = None,
     ):
         """
         Args:
             templates: templates with placeholder variable names
             expected_vars: variables expected in all templates
             prompt_class: allows custom prompt classes
+            name: identifies the ensemble in metrics
+            workers: processes rendering batches of at least
+                `parallel_threshold` prompts, see `build_grid`. It is an
+                attribute rather than a `build_many` argument so that every
+                keyword argument stays free for template variables.
 
         Examples:
         >>> templates = ["a photo of a <class>", "picture of <class>"]
@@ -26,6 +42,8 @@ class PromptEnsemble:
         ```
         """
 
+        self.name = name
+        self.workers = workers
         self.prompts = []
         for template in templates:
             if isinstance(template, str):
@@ -69,28 +87,150 @@ class PromptEnsemble:
             )
         ```
         """
+        if metrics.sink is not None:
+            return metrics.observe(
+                "ensemble.build_many",
+                self.name,
+                self._build_many,
+                kwargs,
+                size=_total_size,
+            )
+        return self._build_many(kwargs)
+
+    def _build_many(self, kwargs: dict[str, Any]) -> list:
+        return self.build_grid(**kwargs).ravel()
+
+    def build_grid(self, **kwargs) -> "PromptGrid":
+        """
+        Build all prompts column-wise, one template at a time.
+
+        Accepts lists or array-like columns (NumPy arrays, pandas Series,
+        Arrow arrays) and returns a grid shaped (n_rows, n_templates).
+
+        With `workers` set, batches of at least `parallel_threshold` prompts
+        are split into row chunks and rendered in a pool of that many processes.
+        Templates are sent once per worker and chunks are reassembled in order.
+
+        Example:
+        ```
+            grid = build_grid(label=np.array(['dog', 'cat', 't-shirt']))
+            grid.shape  # (3, n_templates)
+            grid[:, 0]  # first template for every label
+        ```
+        """
         strict = kwargs.pop("strict", False)
-        var_names = list(kwargs.keys())
-        n_vars = len(kwargs[var_names[0]])
-
-        ns = set([len(v) for v in kwargs.values()])
-        if len(ns) > 1:
-            raise ArgumentNumberOfElementsError(
-                f"All arguments must have the same number of elements."
-                f"Current element sizes: {ns}"
+        columns, n_rows = _as_columns(kwargs)
+        workers = self.workers
+        if (
+            workers is not None
+            and workers > 1
+            and n_rows * len(self.prompts) >= self.parallel_threshold
+        ):
+            rendered = self._render_parallel(columns, n_rows, strict, workers)
+        else:
+            rendered = _render_columns(self.prompts, columns, n_rows, strict)
+        return PromptGrid(rendered, n_rows)
+
+    def build_unique(self, **kwargs) -> tuple[list[str], list[list[int]]]:
+        """
+        Build all prompts, keeping each distinct string once.
+
+        Returns the unique prompts, in order of first appearance in
+        `build_many`, and an index shaped (n_rows, n_templates) pointing each
+        prompt to its position in the unique list. Encode the unique prompts
+        only, then gather with the index.
+
+        Example:
+        ```
+            unique, index = build_unique(label=['dog', 'dog'])
+            embeddings = encode(unique)[np.array(index)]  # (2, n_templates, dim)
+        ```
+        """
+        return self.build_grid(**kwargs).unique()
+
+    def build_product(self, **kwargs) -> "PromptProduct":
+        """
+        Lazily build the prompts of every combination of the given values.
+
+        Returns a sequence that renders prompts on access, in the order
+        `build_many` would give for the fully expanded lists (last variable
+        varying fastest, then templates). Its length is known up front, and
+        indexing, slicing and `shard` never materialize the product.
+
+        Example:
+        ```
+            product = build_product(
+                label=['dog', 'cat'], style=['photo', 'drawing', 'sketch']
             )
+            len(product)  # 2 * 3 * n_templates
+            for prompt in product.shard(worker_id, n_workers):
+                ...
+        ```
+        """
+        strict = kwargs.pop("strict", False)
+        columns = {var_name: _as_list(values) for var_name, values in kwargs.items()}
+        return PromptProduct(self.prompts, columns, strict)
 
-        vars_to_fill = [
-            {var_name: kwargs[var_name][i] for var_name in var_names}
-            for i in range(n_vars)
+    def _render_parallel(
+        self,
+        columns: dict[str, Sequence[str]],
+        n_rows: int,
+        strict: bool,
+        workers: int,
+    ) -> list[list[str]]:
+        chunk_size = -(-n_rows // (workers * self.chunks_per_worker))
+        chunks = [
+            (
+                {name: column[i : i + chunk_size] for name, column in columns.items()},
+                strict,
+            )
+            for i in range(0, n_rows, chunk_size)
         ]
+        rendered: list[list[str]] = [[] for _ in self.prompts]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.prompts,),
+        ) as executor:
+            for chunk in executor.map(_render_chunk, chunks):
+                for template_column, chunk_column in zip(rendered, chunk):
+                    template_column.extend(chunk_column)
+        return rendered
 
-        filled_prompts = [
-            prompt.build(**var_fill, strict=strict)
-            for var_fill in vars_to_fill
-            for prompt in self.prompts
-        ]
-        return filled_prompts
+    def iter_many(
+        self, chunk_size: int | None = None, **kwargs
+    ) -> Iterator[str] | Iterator[list[str]]:
+        """
+        Lazy version of `build_many`.
+
+        Yields the same prompts in the same order, one at a time or in lists
+        of at most `chunk_size` prompts, so only one row (or chunk) is held in
+        memory at once.
+
+        Example:
+        ```
+            for batch in iter_many(chunk_size=256, label=labels):
+                embeddings.append(encode(batch))
+        ```
+        """
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+
+        strict = kwargs.pop("strict", False)
+        columns, n_rows = _as_columns(kwargs)
+
+        filled_prompts = self._iter_rows(columns, n_rows, strict)
+        if chunk_size is None:
+            return filled_prompts
+        return _chunked(filled_prompts, chunk_size)
+
+    def _iter_rows(
+        self, columns: dict[str, Sequence[str]], n_rows: int, strict: bool
+    ) -> Iterator[str]:
+        for i in range(n_rows):
+            var_fill = {name: column[i] for name, column in columns.items()}
+            for prompt in self.prompts:
+                yield prompt.build(**var_fill, strict=strict)
 
     @classmethod
     def from_paths(cls, paths: list[str], prompt_class=DynamicPrompt):
@@ -102,3 +242,229 @@ class PromptEnsemble:
 
     def __len__(self) -> int:
         return len(self.prompts)
+
+
+def _total_size(prompts: list[str]) -> int:
+    return sum(map(len, prompts))
+
+
+def _chunked(iterable: Iterator[str], size: int) -> Iterator[list[str]]:
+    while chunk := list(islice(iterable, size)):
+        yield chunk
+
+
+def _render_columns(
+    prompts: list[DynamicPrompt],
+    columns: dict[str, Sequence[str]],
+    n_rows: int,
+    strict: bool,
+) -> list[list[str]]:
+    rendered = []
+    for prompt in prompts:
+        if n_rows == 0:
+            rendered.append([])
+        elif type(prompt).build is DynamicPrompt.build:
+            # column rendering would skip a `build` override
+            rendered.append(prompt.build_column(strict=strict, **columns))
+        else:
+            rendered.append(
+                [
+                    prompt.build(
+                        strict=strict,
+                        **{name: column[i] for name, column in columns.items()},
+                    )
+                    for i in range(n_rows)
+                ]
+            )
+    return rendered
+
+
+_worker_prompts: list[DynamicPrompt] = []
+
+
+def _init_worker(prompts: list[DynamicPrompt]):
+    global _worker_prompts
+    _worker_prompts = prompts
+
+
+def _render_chunk(chunk: tuple[dict[str, Sequence[str]], bool]) -> list[list[str]]:
+    columns, strict = chunk
+    n_rows = len(next(iter(columns.values())))
+    return _render_columns(_worker_prompts, columns, n_rows, strict)
+
+
+def _as_list(values: Any) -> Sequence[str]:
+    if hasattr(values, "to_pylist"):  # Arrow arrays
+        return values.to_pylist()
+    if hasattr(values, "tolist"):  # NumPy arrays, pandas Series
+        return values.tolist()
+    if not isinstance(values, (list, tuple)):
+        return list(values)
+    return values
+
+
+def _as_columns(kwargs: dict[str, Any]) -> tuple[dict[str, Sequence[str]], int]:
+    columns = {var_name: _as_list(values) for var_name, values in kwargs.items()}
+
+    ns = set([len(v) for v in columns.values()])
+    if len(ns) > 1:
+        raise ArgumentNumberOfElementsError(
+            f"All arguments must have the same number of elements."
+            f"Current element sizes: {ns}"
+        )
+    n_rows = ns.pop() if ns else 0
+    return columns, n_rows
+
+
+class PromptGrid:
+    """
+    Prompts rendered by `PromptEnsemble.build_grid`, shaped (n_rows, n_templates).
+
+    Prompts are stored one column per template, so selecting a template is
+    free and rows are assembled only when requested.
+
+    >>> grid = PromptGrid([["dog", "cat"], ["a dog", "a cat"]], n_rows=2)
+    >>> grid.shape
+    (2, 2)
+    >>> grid[1]
+    ['cat', 'a cat']
+    >>> grid[:, 1]
+    ['a dog', 'a cat']
+    >>> grid.ravel()
+    ['dog', 'a dog', 'cat', 'a cat']
+    """
+
+    def __init__(self, columns: list[list[str]], n_rows: int):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (self.n_rows, len(self.columns))
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, templates = key
+            if isinstance(templates, int):
+                return self.columns[templates][rows]
+            return PromptGrid(self.columns[templates], self.n_rows)[rows]
+        if isinstance(key, slice):
+            return PromptGrid(
+                [column[key] for column in self.columns],
+                len(range(self.n_rows)[key]),
+            )
+        return [column[key] for column in self.columns]
+
+    def __iter__(self) -> Iterator[list[str]]:
+        return map(list, zip(*self.columns))
+
+    def tolist(self) -> list[list[str]]:
+        return list(self)
+
+    def ravel(self) -> list[str]:
+        """Flatten row by row, in the same order as `build_many`."""
+        return [prompt for row in zip(*self.columns) for prompt in row]
+
+    def unique(self) -> tuple[list[str], list[list[int]]]:
+        """
+        Distinct prompts and the (n_rows, n_templates) index into them.
+
+        >>> grid = PromptGrid([["dog", "cat"], ["dog", "a cat"]], n_rows=2)
+        >>> grid.unique()
+        (['dog', 'cat', 'a cat'], [[0, 0], [1, 2]])
+        """
+        ids: dict[str, int] = {}
+        index = [
+            [ids.setdefault(prompt, len(ids)) for prompt in row]
+            for row in zip(*self.columns)
+        ]
+        return list(ids), index
+
+    def to_numpy(self):
+        import numpy as np
+
+        if not self.columns:
+            return np.empty(self.shape, dtype=str)
+        return np.array(self.columns, dtype=str).T
+
+
+class PromptProduct(SequenceABC):
+    """
+    Prompts of every combination of variable values, rendered on access.
+
+    Prompt `i` is template `i % n_templates` filled with combination
+    `i // n_templates`, so any prompt, slice or shard is computed directly
+    from its position.
+
+    >>> product = PromptProduct(
+    ...     [DynamicPrompt("<size> <label>")],
+    ...     {"size": ["big", "small"], "label": ["dog", "cat"]},
+    ... )
+    >>> len(product)
+    4
+    >>> product[-1]
+    'small cat'
+    >>> list(product.shard(0, 2))
+    ['big dog', 'big cat']
+    """
+
+    def __init__(
+        self,
+        prompts: list[DynamicPrompt],
+        columns: dict[str, Sequence[str]],
+        strict: bool = False,
+        positions: range | None = None,
+    ):
+        self.prompts = prompts
+        self.columns = columns
+        self.strict = strict
+        self.n_rows = prod(len(values) for values in columns.values())
+        if positions is None:
+            positions = range(self.n_rows * len(prompts))
+        self.positions = positions
+
+    def row(self, index: int) -> dict[str, str]:
+        """Variable values of combination `index`."""
+        values = {}
+        for var_name, column in reversed(self.columns.items()):
+            index, position = divmod(index, len(column))
+            values[var_name] = column[position]
+        return values
+
+    def shard(self, index: int, count: int) -> "PromptProduct":
+        """Part `index` of `count` contiguous, near-equal parts."""
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index must be in [0, {count}), got {index}.")
+        n_prompts = len(self.positions)
+        start = n_prompts * index // count
+        stop = n_prompts * (index + 1) // count
+        return self[start:stop]
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return PromptProduct(
+                self.prompts, self.columns, self.strict, self.positions[key]
+            )
+        row, template = divmod(self.positions[key], len(self.prompts))
+        return self.prompts[template].build(strict=self.strict, **self.row(row))
+
+    def __iter__(self) -> Iterator[str]:
+        n_templates = len(self.prompts)
+        last_row, values = -1, {}
+        for position in self.positions:
+            row, template = divmod(position, n_templates)
+            if row != last_row:
+                last_row, values = row, self.row(row)
+            yield self.prompts[template].build(strict=self.strict, **values)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(n_rows={self.n_rows}, "
+            f"n_templates={len(self.prompts)}, positions={self.positions})"
+        )
@@ -40,3 +40,21 @@ class TemplateNotInPromptError(PromptError):
     """Template not found in prompt"""
 
     pass
+
+
+class DuplicatePromptNameError(PromptError):
+    """Two prompt files declare the same name"""
+
+    pass
+
+
+class ContextLengthExceededError(PromptError):
+    """Messages that must be kept do not fit in the context window"""
+
+    pass
+
+
+class SchemaMismatchError(PromptError):
+    """A snapshot was restored into a prompt with a different schema"""
+
+    pass
@@ -0,0 +1,154 @@
+"""
+Load a whole directory of prompt files at once.
+
+Files are read, parsed (with libyaml's C parser when available), validated
+and built in a pool of processes, and the prompts are sent back to the
+caller. Files that fail are reported instead of stopping the load.
+
+>>> result = load_prompts("samples/")  # doctest: +SKIP
+>>> result.prompts["basic_turbo_prompt"]  # doctest: +SKIP
+>>> result.errors  # doctest: +SKIP
+[]
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple, Union
+
+from .dynamic import DynamicPrompt
+from .exceptions import DuplicatePromptNameError
+from .schemas import prompt_from_schema, schema_class_for
+from .turbo import TurboPrompt
+from .utils import find_prompt_files, yaml_safe_loader
+
+Prompt = Union[DynamicPrompt, TurboPrompt]
+
+# Smallest number of files worth sending to a process pool
+PARALLEL_THRESHOLD = 64
+STAGES = ("read", "parse", "validate", "build")
+
+
+class FileError(NamedTuple):
+    path: str
+    # stage that failed: one of STAGES, or "name" for duplicate names
+    stage: str
+    error: str
+    message: str
+
+
+class LoadResult(NamedTuple):
+    prompts: dict[str, Prompt]
+    # file each prompt was loaded from
+    sources: dict[str, str]
+    errors: list[FileError]
+    # seconds per stage summed over files, plus "discover" and the wall
+    # clock "total"
+    timings: dict[str, float]
+
+
+def load_prompts(
+    source: str | os.PathLike | Iterable[str | os.PathLike],
+    workers: int | None = None,
+) -> LoadResult:
+    """
+    Load every prompt file of `source` into a name -> prompt mapping.
+
+    Args:
+        source: a directory (searched recursively for .yaml/.yml files), a
+            glob pattern such as "prompts/**/*.yaml", or a list of paths
+        workers: processes to use, all CPUs by default. Fewer than
+            `PARALLEL_THRESHOLD` files are loaded in this process.
+
+    When two files declare the same name, the first path in sorted order
+    wins and the other one is reported as an error.
+    """
+    start = time.perf_counter()
+    paths = _find_files(source)
+    timings = dict.fromkeys(STAGES, 0.0)
+    timings["discover"] = time.perf_counter() - start
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(paths) >= PARALLEL_THRESHOLD:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_load_file, paths, chunksize=chunksize))
+    else:
+        results = [_load_file(path) for path in paths]
+
+    prompts: dict[str, Prompt] = {}
+    sources: dict[str, str] = {}
+    errors: list[FileError] = []
+    for path, name, prompt, error, file_timings in results:
+        for stage, seconds in file_timings.items():
+            timings[stage] += seconds
+        if error is not None:
+            errors.append(error)
+        elif name in prompts:
+            errors.append(
+                FileError(
+                    path,
+                    "name",
+                    DuplicatePromptNameError.__name__,
+                    f"Prompt {name!r} is defined in both "
+                    f"{sources[name]} and {path}",
+                )
+            )
+        else:
+            prompts[name] = prompt
+            sources[name] = path
+
+    timings["total"] = time.perf_counter() - start
+    return LoadResult(prompts, sources, errors, timings)
+
+
+def _find_files(source: str | os.PathLike | Iterable[str | os.PathLike]) -> list[str]:
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.isdir(source):
+            return [str(path) for path in find_prompt_files(source)]
+        return sorted(glob.glob(os.fspath(source), recursive=True))
+    return sorted(os.fspath(path) for path in source)
+
+
+def _load_file(
+    path: str,
+) -> tuple[str, str | None, Prompt | None, FileError | None, dict[str, float]]:
+    """Load one file, returning its name, prompt, error and stage timings."""
+    import yaml
+
+    timings: dict[str, float] = {}
+    stage = "read"
+    start = time.perf_counter()
+    try:
+        text = Path(path).read_text()
+        timings[stage] = time.perf_counter() - start
+
+        stage, start = "parse", time.perf_counter()
+        prompt_data = yaml.load(text, Loader=yaml_safe_loader())
+        timings[stage] = time.perf_counter() - start
+
+        stage, start = "validate", time.perf_counter()
+        if not isinstance(prompt_data, dict):
+            raise ValueError("Prompt files must contain a mapping")
+        schema = schema_class_for(prompt_data)(**prompt_data)
+        timings[stage] = time.perf_counter() - start
+
+        stage, start = "build", time.perf_counter()
+        prompt = prompt_from_schema(schema)
+        timings[stage] = time.perf_counter() - start
+    except Exception as e:
+        timings[stage] = time.perf_counter() - start
+        # exceptions (e.g. pydantic's) may not survive pickling, send text
+        return (
+            path,
+            None,
+            None,
+            FileError(path, stage, type(e).__name__, str(e)),
+            timings,
+        )
+    return path, schema.name, prompt, None, timings
@@ -0,0 +1,238 @@
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from itertools import islice
+
+from .tokens import Tokenizer, count_message_tokens
+
+
+class Message(Mapping):
+    """
+    Compact, read-only message stored in a `TurboPrompt` history.
+
+    Messages use slots instead of a dict per message, and share the role
+    strings of `PromptRole`. They read like ChatML dicts and are only turned
+    into real dicts by `to_dict`, when a prompt is built.
+
+    >>> message = Message("user", "hi")
+    >>> message["content"]
+    'hi'
+    >>> message == {"role": "user", "content": "hi"}
+    True
+    >>> message.to_dict()
+    {'role': 'user', 'content': 'hi'}
+    """
+
+    # _token_count: (tokenizer, count) of the last token count, see `message_tokens`
+    # _frozen: the message as returned by `build`, see `frozen_message`
+    __slots__ = ("role", "content", "name", "_token_count", "_frozen")
+
+    def __init__(self, role: str, content: str, name: str | None = None):
+        self.role = role
+        self.content = content
+        self.name = name
+        self._token_count = None
+        self._frozen = None
+
+    def __getitem__(self, key: str) -> str:
+        if key == "content":
+            return self.content
+        if key == "role":
+            return self.role
+        if key == "name" and self.name is not None:
+            return self.name
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "role"
+        yield "content"
+        if self.name is not None:
+            yield "name"
+
+    def __len__(self) -> int:
+        return 2 if self.name is None else 3
+
+    def to_dict(self, cls: type[dict] = dict) -> dict[str, str]:
+        if self.name is None:
+            return cls(role=self.role, content=self.content)
+        return cls(role=self.role, content=self.content, name=self.name)
+
+    def __reduce__(self):
+        return (self.__class__, (self.role, self.content, self.name))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+
+class FrozenMessage(dict):
+    """
+    Read-only ChatML message, as returned by `TurboPrompt.build`.
+
+    >>> message = FrozenMessage(role="user", content="hi")
+    >>> message["content"]
+    'hi'
+    >>> message["content"] = "bye"
+    Traceback (most recent call last):
+    ...
+    TypeError: FrozenMessage is read-only, use build(mutable=True) for editable messages
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(
+            f"{self.__class__.__name__} is read-only, "
+            "use build(mutable=True) for editable messages"
+        )
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self) -> "FrozenMessage":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "FrozenMessage":
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+def frozen_message(message: Mapping[str, str]) -> FrozenMessage:
+    """
+    Return a message as a `FrozenMessage`, built once per stored message.
+
+    Frozen messages are read-only, so every build of a prompt (or of its
+    forks) hands out the same dict for a stored message instead of a copy.
+    """
+    if not isinstance(message, Message):
+        return FrozenMessage(message)
+
+    frozen = message._frozen
+    if frozen is None:
+        frozen = message._frozen = message.to_dict(FrozenMessage)
+    return frozen
+
+
+def message_tokens(message: Mapping[str, str], tokenizer: Tokenizer) -> int:
+    """
+    Count the tokens of a message, caching the count on stored messages.
+
+    Stored messages never change, so each one is only tokenized once per
+    tokenizer, even when it is shared by forks or prompts of one schema.
+    """
+    if not isinstance(message, Message):
+        return count_message_tokens(message, tokenizer)
+
+    cached = message._token_count
+    if cached is not None and cached[0] is tokenizer:
+        return cached[1]
+    n_tokens = count_message_tokens(message, tokenizer)
+    message._token_count = (tokenizer, n_tokens)
+    return n_tokens
+
+
+class MessageHistory(Sequence):
+    """
+    Append-only sequence of messages that can share a prefix with others.
+
+    `fork` returns a history that reuses the current messages without
+    copying them, so many branches of one conversation only cost memory for
+    the messages each of them adds. Branches never see each other's
+    messages, even when the original keeps growing.
+
+    >>> history = MessageHistory(["system", "user"])
+    >>> branch = history.fork()
+    >>> branch.append("assistant")
+    >>> history.append("other assistant")
+    >>> list(branch)
+    ['system', 'user', 'assistant']
+    """
+
+    __slots__ = ("_parent", "_prefix_len", "_items")
+
+    def __init__(self, messages: Iterable = ()):
+        # older messages, shared with other branches: a chain of
+        # (items, length, start, parent) segments, newest first, each one
+        # holding `length` messages of a shared list starting at `start`
+        self._parent: tuple | None = None
+        self._prefix_len = 0
+        self._items = list(messages)
+
+    def fork(self) -> "MessageHistory":
+        forked = MessageHistory()
+        forked._parent = self._parent
+        if self._items:
+            forked._parent = (
+                self._items,
+                len(self._items),
+                self._prefix_len,
+                self._parent,
+            )
+        forked._prefix_len = len(self)
+        return forked
+
+    def append(self, message):
+        self._items.append(message)
+
+    def extend(self, messages: Iterable):
+        self._items.extend(messages)
+
+    def clear(self):
+        # other branches may still reference the old lists, so never mutate them
+        self._parent = None
+        self._prefix_len = 0
+        self._items = []
+
+    def __len__(self) -> int:
+        return self._prefix_len + len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("message index out of range")
+        if index >= self._prefix_len:
+            return self._items[index - self._prefix_len]
+        # recent messages are the most read, so walk back from the newest
+        segment = self._parent
+        while index < segment[2]:
+            segment = segment[3]
+        return segment[0][index - segment[2]]
+
+    def __iter__(self) -> Iterator:
+        segments = []
+        segment = self._parent
+        while segment is not None:
+            segments.append(segment)
+            segment = segment[3]
+        for items, length, _, _ in reversed(segments):
+            yield from islice(items, length)
+        yield from self._items
+
+    def __reduce__(self):
+        # flatten, pickling the chain would recurse once per fork
+        return (self.__class__, (list(self),))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+
+def to_chatml(message: Mapping[str, str], cls: type[dict] = dict) -> dict[str, str]:
+    """Materialize a stored message (or any message mapping) as a `cls` dict."""
+    if cls is FrozenMessage:
+        return frozen_message(message)
+    if isinstance(message, Message):
+        return message.to_dict(cls)
+    return cls(message)
@@ -0,0 +1,195 @@
+"""
+Opt-in instrumentation of prompt rendering.
+
+Instrumented calls check `metrics.sink` first and skip all timing when it is
+None (the default), so disabled instrumentation costs one attribute lookup.
+
+>>> from prompts import DynamicPrompt, metrics
+>>> registry = metrics.InMemoryRegistry()
+>>> metrics.set_sink(registry)
+>>> DynamicPrompt("a photo of a <label>", name="photo").build(label="dog")
+'a photo of a dog'
+>>> registry.get("dynamic.build", "photo").calls
+1
+>>> metrics.set_sink(None)
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Protocol, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    1e-6,
+    5e-6,
+    1e-5,
+    5e-5,
+    1e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    1e-2,
+    5e-2,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+
+class MetricsSink(Protocol):
+    def record(
+        self,
+        operation: str,
+        name: str,
+        duration: float,
+        size: int = 0,
+        error: str | None = None,
+    ) -> None:
+        """
+        Args:
+            operation: instrumented call, e.g. "dynamic.build"
+            name: prompt name (file path for file loading)
+            duration: wall time in seconds
+            size: characters rendered
+            error: exception class name when the call failed
+        """
+        ...
+
+
+sink: MetricsSink | None = None
+
+
+def set_sink(new_sink: MetricsSink | None):
+    """Send metrics to `new_sink`, or disable instrumentation with None."""
+    global sink
+    sink = new_sink
+
+
+def observe(
+    operation: str,
+    name: str,
+    fn: Callable[..., T],
+    *args: Any,
+    size: Callable[[T], int] | None = None,
+) -> T:
+    """Call `fn(*args)` and record it on the current sink."""
+    current = sink
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception as e:
+        if current is not None:
+            current.record(
+                operation,
+                name,
+                time.perf_counter() - start,
+                error=e.__class__.__name__,
+            )
+        raise
+    if current is not None:
+        current.record(
+            operation,
+            name,
+            time.perf_counter() - start,
+            size=size(result) if size is not None else 0,
+        )
+    return result
+
+
+class OperationStats:
+    __slots__ = (
+        "calls",
+        "errors",
+        "strict_failures",
+        "rendered_chars",
+        "total_seconds",
+        "buckets",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.strict_failures = 0
+        self.rendered_chars = 0
+        self.total_seconds = 0.0
+        # counts per LATENCY_BUCKETS bound, plus a last +Inf bucket
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class InMemoryRegistry:
+    """Thread-safe sink aggregating calls per (operation, prompt name)."""
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        operation: str,
+        name: str,
+        duration: float,
+        size: int = 0,
+        error: str | None = None,
+    ):
+        with self._lock:
+            stats = self._stats.get((operation, name))
+            if stats is None:
+                stats = self._stats[(operation, name)] = OperationStats()
+            stats.calls += 1
+            stats.total_seconds += duration
+            stats.rendered_chars += size
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+            if error is not None:
+                stats.errors += 1
+                if error == "UndefinedVariableError":
+                    stats.strict_failures += 1
+
+    def get(self, operation: str, name: str) -> OperationStats:
+        return self._stats.get((operation, name), OperationStats())
+
+    def items(self) -> list[tuple[tuple[str, str], OperationStats]]:
+        with self._lock:
+            return sorted(self._stats.items())
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def to_prometheus(registry: InMemoryRegistry, prefix: str = "prompts") -> str:
+    """Render `registry` in the Prometheus text exposition format."""
+    items = [
+        (f'operation="{operation}",name="{_escape(name)}"', stats)
+        for (operation, name), stats in registry.items()
+    ]
+    lines = []
+    for metric, attribute in (
+        ("calls_total", "calls"),
+        ("errors_total", "errors"),
+        ("strict_failures_total", "strict_failures"),
+        ("rendered_chars_total", "rendered_chars"),
+    ):
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        for labels, stats in items:
+            lines.append(f"{prefix}_{metric}{{{labels}}} {getattr(stats, attribute)}")
+
+    lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+    for labels, stats in items:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+            cumulative += count
+            lines.append(
+                f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                f"{cumulative}"
+            )
+        lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {stats.total_seconds}")
+        lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {stats.calls}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
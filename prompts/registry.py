@@ -0,0 +1,225 @@
+"""
+Directory of prompt files, indexed by prompt name and reloaded on change.
+
+The registry publishes its prompts as an immutable `RegistrySnapshot` and
+replaces it with a single attribute assignment whenever files change.
+Readers never lock: a lookup sees either the previous snapshot or the new
+one, never a partly loaded directory.
+
+>>> registry = PromptRegistry("samples")  # doctest: +SKIP
+>>> registry.start(interval=2.0)  # doctest: +SKIP
+>>> prompt = registry["basic_turbo_prompt"].fork()  # doctest: +SKIP
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterator, NamedTuple, Union
+
+from .dynamic import DynamicPrompt
+from .exceptions import DuplicatePromptNameError
+from .schemas import prompt_from_data
+from .turbo import TurboPrompt
+from .utils import find_prompt_files, load_yaml
+
+Prompt = Union[DynamicPrompt, TurboPrompt]
+
+
+class FileEntry(NamedTuple):
+    # (st_mtime_ns, st_size) of the file when it was parsed
+    version: tuple[int, int]
+    name: str | None
+    prompt: Prompt | None
+    error: Exception | None
+
+
+class RegistrySnapshot(Mapping):
+    """
+    Immutable mapping of prompt name to prompt at one point in time.
+
+    Prompts are shared by every reader: fork `TurboPrompt`s (or copy them)
+    before adding messages.
+    """
+
+    __slots__ = ("generation", "files", "sources", "_prompts")
+
+    def __init__(
+        self,
+        generation: int,
+        files: dict[Path, FileEntry],
+        sources: dict[str, Path],
+    ):
+        self.generation = generation
+        self.files: Mapping[Path, FileEntry] = MappingProxyType(files)
+        # file each published prompt comes from
+        self.sources: Mapping[str, Path] = MappingProxyType(sources)
+        self._prompts: Mapping[str, Prompt] = MappingProxyType(
+            {name: files[path].prompt for name, path in sources.items()}
+        )
+
+    @property
+    def errors(self) -> dict[Path, Exception]:
+        """Files that failed to load or are not published, with the reason."""
+        errors = {}
+        for path, entry in self.files.items():
+            if entry.error is not None:
+                errors[path] = entry.error
+            elif entry.prompt is not None and self.sources[entry.name] != path:
+                errors[path] = DuplicatePromptNameError(
+                    f"Prompt {entry.name!r} is defined in both "
+                    f"{self.sources[entry.name]} and {path}"
+                )
+        return errors
+
+    def __getitem__(self, name: str) -> Prompt:
+        return self._prompts[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._prompts)
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(generation={self.generation}, "
+            f"prompts={list(self._prompts)})"
+        )
+
+
+class PromptRegistry:
+    def __init__(self, directory: str | os.PathLike):
+        """
+        Index every prompt file under `directory` by prompt name.
+
+        Files are loaded right away; call `refresh` to pick up changes, or
+        `start` to poll for them in a background thread. A file that fails
+        to load (invalid YAML or schema, or a name already used by another
+        file) is reported in `snapshot.errors`, and its last good version
+        stays published.
+        """
+        self.directory = Path(directory)
+        self._snapshot = RegistrySnapshot(0, {}, {})
+        # serializes refreshes, readers never take it
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.refresh()
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        return self._snapshot
+
+    def get(self, name: str, default: Prompt | None = None) -> Prompt | None:
+        return self._snapshot.get(name, default)
+
+    def __getitem__(self, name: str) -> Prompt:
+        return self._snapshot[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._snapshot
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def refresh(self) -> bool:
+        """
+        Reparse new and modified files and publish a new snapshot.
+
+        Returns whether anything changed.
+        """
+        with self._refresh_lock:
+            current = self._snapshot
+            files: dict[Path, FileEntry] = {}
+            changed = False
+            for path in find_prompt_files(self.directory):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:  # deleted while scanning
+                    continue
+                version = (stat.st_mtime_ns, stat.st_size)
+                entry = current.files.get(path)
+                if entry is None or entry.version != version:
+                    entry = _load_entry(path, version, previous=entry)
+                    changed = True
+                files[path] = entry
+            changed = changed or files.keys() != current.files.keys()
+            if not changed:
+                return False
+
+            self._snapshot = RegistrySnapshot(
+                current.generation + 1, files, _assign_names(files, current)
+            )
+            return True
+
+    def start(self, interval: float = 1.0):
+        """Poll for changes every `interval` seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll,
+            args=(interval,),
+            name=f"PromptRegistry({self.directory})",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _poll(self, interval: float):
+        while not self._stop.wait(interval):
+            self.refresh()
+
+    def __enter__(self) -> PromptRegistry:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _load_entry(
+    path: Path, version: tuple[int, int], previous: FileEntry | None
+) -> FileEntry:
+    try:
+        prompt_data = load_yaml(str(path))
+        schema, prompt = prompt_from_data(prompt_data)
+    except Exception as e:
+        # keep serving the last good version of the file
+        if previous is not None:
+            return previous._replace(version=version, error=e)
+        return FileEntry(version, None, None, e)
+    return FileEntry(version, schema.name, prompt, None)
+
+
+def _assign_names(
+    files: dict[Path, FileEntry], previous: RegistrySnapshot
+) -> dict[str, Path]:
+    """
+    Pick the file that provides each prompt name.
+
+    A file keeps a name it already provided, so adding a file with a taken
+    name does not replace the served prompt. Otherwise the first file in
+    path order wins.
+    """
+    sources = {}
+    for name, path in previous.sources.items():
+        entry = files.get(path)
+        if entry is not None and entry.name == name and entry.prompt is not None:
+            sources[name] = path
+    for path, entry in files.items():
+        if entry.prompt is not None:
+            sources.setdefault(entry.name, path)
+    return sources
@@ -1,10 +1,14 @@
 import re
 from enum import Enum
-from typing import NotRequired
+from typing import TYPE_CHECKING, NotRequired
 
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
+if TYPE_CHECKING:
+    from .dynamic import DynamicPrompt
+    from .turbo import TurboPrompt
+
 
 # ==== Generic classes ====
 class OpenAIModelSettings(BaseModel):
@@ -101,3 +105,35 @@ class TurboSchema(BaseModel):
                     template_vars += pattern.findall(template)
 
         return template_vars
+
+
+def schema_class_for(prompt_data: dict) -> type[DynamicSchema] | type[TurboSchema]:
+    """Pick the schema of a parsed prompt file from its keys."""
+    if "template" in prompt_data:
+        return DynamicSchema
+    return TurboSchema
+
+
+def prompt_from_schema(
+    schema: DynamicSchema | TurboSchema,
+) -> "DynamicPrompt | TurboPrompt":
+    """Build the `DynamicPrompt` or `TurboPrompt` of a validated schema."""
+    # prompt modules import this one
+    from .dynamic import DynamicPrompt
+    from .turbo import TurboPrompt
+
+    if isinstance(schema, DynamicSchema):
+        return DynamicPrompt.from_schema(schema)
+    return TurboPrompt.from_turbo_schema(schema)
+
+
+def prompt_from_data(
+    prompt_data: dict,
+) -> "tuple[DynamicSchema | TurboSchema, DynamicPrompt | TurboPrompt]":
+    """
+    Validate a parsed prompt file and build its prompt.
+
+    Returns the schema and the prompt.
+    """
+    schema = schema_class_for(prompt_data)(**prompt_data)
+    return schema, prompt_from_schema(schema)
@@ -0,0 +1,199 @@
+"""
+Compact binary snapshots of conversations, with append-only deltas.
+
+A snapshot stores the messages of a `TurboPrompt` (or `TurboConversation`)
+and refers to the schema it was created from by name and content hash: the
+schema's initial messages are not stored, they come back from the prompt
+given to `restore`. A delta only stores the messages added since a given
+length, and can be appended to the stored snapshot bytes as-is.
+
+    data = dump_snapshot(conversation)
+    saved = len(conversation.prompts)
+    ...  # next request adds messages
+    data += dump_delta(conversation, since=saved)
+    conversation = restore(data, TurboPrompt.from_file("chat.yaml"))
+
+Restoring trusts the data: messages are rebuilt directly, without pydantic
+validation, so only restore snapshots you wrote yourself.
+
+Layout: a header (magic, version, flags, schema hash, number of omitted
+initial messages, pinned messages, name length), the UTF-8 prompt name,
+then frames. A frame is the number of messages before it and its message
+count, followed by its messages: a role/flags byte, content and name
+lengths, then the UTF-8 content and name.
+"""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Mapping
+from itertools import islice
+from typing import Union
+
+from .exceptions import SchemaMismatchError
+from .messages import Message, MessageHistory
+from .schemas import PromptRole
+from .turbo import TurboConversation, TurboPrompt, TurboTemplates
+
+Conversation = Union[TurboPrompt, TurboConversation]
+
+MAGIC = b"PRMPTCNV"
+VERSION = 1
+HEADER = struct.Struct("<8sBB16sIIH")
+FRAME = struct.Struct("<II")
+RECORD = struct.Struct("<BII")
+
+HAS_SCHEMA_HASH = 1
+HAS_NAME = 0x80
+ROLES = tuple(role.value for role in PromptRole)
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+
+def dump_snapshot(conversation: Conversation) -> bytes:
+    """
+    Serialize the messages of `conversation`.
+
+    Initial messages rendered from the schema are left out when the
+    conversation knows its schema hash.
+    """
+    schema_hash = conversation.schema_hash
+    flags = 0
+    n_initial = 0
+    if schema_hash is not None:
+        flags |= HAS_SCHEMA_HASH
+        n_initial = conversation.pinned_messages
+
+    name = conversation.name.encode()
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        schema_hash or bytes(16),
+        n_initial,
+        conversation.pinned_messages,
+        len(name),
+    )
+    return header + name + dump_delta(conversation, since=n_initial)
+
+
+def dump_delta(conversation: Conversation, since: int) -> bytes:
+    """Serialize the messages added after the first `since` ones."""
+    n_messages = len(conversation.prompts)
+    if not 0 <= since <= n_messages:
+        raise ValueError(
+            f"since must be between 0 and {n_messages} messages, got {since}."
+        )
+
+    chunks = [FRAME.pack(since, n_messages - since)]
+    for message in islice(conversation.prompts, since, None):
+        content = message["content"].encode()
+        name = message.get("name")
+        code = ROLE_CODES[message["role"]]
+        if name is None:
+            chunks.append(RECORD.pack(code, len(content), 0))
+            chunks.append(content)
+        else:
+            name = name.encode()
+            chunks.append(RECORD.pack(code | HAS_NAME, len(content), len(name)))
+            chunks.append(content)
+            chunks.append(name)
+    return b"".join(chunks)
+
+
+def restore(
+    data: bytes,
+    source: TurboPrompt | TurboTemplates | Mapping[str, TurboPrompt | TurboTemplates],
+) -> Conversation:
+    """
+    Rebuild a conversation from a snapshot followed by any number of deltas.
+
+    Args:
+        data: `dump_snapshot` bytes, with `dump_delta` bytes appended
+        source: the prompt (or template set) the conversation was created
+            from, or a mapping of prompt name to prompts, such as a
+            `PromptRegistry`
+
+    Returns a fork of a `TurboPrompt` source, or a `TurboConversation` of a
+    `TurboTemplates` one. Raises `SchemaMismatchError` when the source does
+    not have the snapshot's name and schema hash.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("Data is too short to be a conversation snapshot")
+    magic, version, flags, schema_hash, n_initial, pinned, name_length = (
+        HEADER.unpack_from(view)
+    )
+    if magic != MAGIC:
+        raise ValueError("Data is not a conversation snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported conversation snapshot version {version}")
+    offset = HEADER.size + name_length
+    # a snapshot always has at least one frame
+    if offset + FRAME.size > len(view):
+        raise ValueError("Truncated conversation snapshot")
+    name = bytes(view[HEADER.size : offset]).decode()
+    if not flags & HAS_SCHEMA_HASH:
+        schema_hash = None
+
+    if not isinstance(source, (TurboPrompt, TurboTemplates)):
+        try:
+            source = source[name]
+        except KeyError:
+            raise SchemaMismatchError(f"No prompt named {name!r} to restore into")
+    if source.name != name or (
+        schema_hash is not None and source.schema_hash != schema_hash
+    ):
+        raise SchemaMismatchError(
+            f"Snapshot of prompt {name!r} does not match prompt {source.name!r}, "
+            "its schema changed since the snapshot was taken"
+        )
+
+    conversation = _start_conversation(source, n_initial)
+    conversation.pinned_messages = pinned
+    history = conversation.prompts
+    end = len(view)
+    try:
+        while offset < end:
+            base, n_messages = FRAME.unpack_from(view, offset)
+            offset += FRAME.size
+            if base != len(history):
+                raise ValueError(
+                    f"Delta starts after {base} messages, but the conversation "
+                    f"has {len(history)}"
+                )
+            for _ in range(n_messages):
+                code, content_length, name_length = RECORD.unpack_from(view, offset)
+                offset += RECORD.size
+                if not code & HAS_NAME:
+                    name_length = 0
+                if offset + content_length + name_length > end:
+                    raise ValueError("Truncated conversation snapshot")
+                content = str(view[offset : offset + content_length], "utf-8")
+                offset += content_length
+                message_name = None
+                if code & HAS_NAME:
+                    message_name = str(view[offset : offset + name_length], "utf-8")
+                    offset += name_length
+                history.append(Message(ROLES[code & ~HAS_NAME], content, message_name))
+    except struct.error as e:
+        # a frame or record header cut short
+        raise ValueError(f"Truncated conversation snapshot: {e}") from None
+    return conversation
+
+
+def _start_conversation(
+    source: TurboPrompt | TurboTemplates, n_initial: int
+) -> Conversation:
+    if isinstance(source, TurboTemplates):
+        conversation = source.conversation()
+    else:
+        conversation = source.fork()
+
+    if len(conversation.prompts) < n_initial:
+        raise SchemaMismatchError(
+            f"Snapshot expects {n_initial} initial messages, "
+            f"the prompt has {len(conversation.prompts)}"
+        )
+    if len(conversation.prompts) > n_initial:
+        conversation.prompts = MessageHistory(islice(conversation.prompts, n_initial))
+    return conversation
@@ -0,0 +1,201 @@
+import codecs
+import io
+import re
+from functools import lru_cache
+from itertools import repeat
+from typing import IO, Mapping, Sequence
+
+SLOT_PATTERN = re.compile(r"<([^<>\s]+)>")
+# Characters encoded at once when writing to a binary stream
+ENCODE_CHUNK_SIZE = 1 << 16
+
+
+class CompiledTemplate:
+    """
+    Template parsed once into literal segments and variable slots.
+
+    Rendering fills every slot in a single pass, so values are never
+    rescanned for other variables. Slots without a value are kept as-is.
+
+    >>> template = CompiledTemplate("a photo of a <label>")
+    >>> template.variables
+    ('label',)
+    >>> template.render({"label": "dog"})
+    'a photo of a dog'
+    """
+
+    __slots__ = ("source", "variables", "names", "_parts", "_slots")
+
+    def __init__(self, source: str):
+        parts: list[str] = []
+        slots: list[tuple[int, str]] = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            if match.start() > position:
+                parts.append(source[position : match.start()])
+            slots.append((len(parts), match.group(1)))
+            parts.append(match.group(0))
+            position = match.end()
+        if position < len(source):
+            parts.append(source[position:])
+
+        self.source = source
+        self.variables = tuple(dict.fromkeys(name for _, name in slots))
+        self.names = frozenset(self.variables)
+        self._parts = parts
+        self._slots = tuple(slots)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            if name in values:
+                parts[index] = values[name]
+        return "".join(parts)
+
+    def render_into(
+        self,
+        values: Mapping[str, str],
+        writer: IO,
+        encoding: str | None = None,
+    ) -> int:
+        """
+        Write the rendered template to `writer` piece by piece.
+
+        Text streams receive `str` pieces. Binary streams (or any writer when
+        `encoding` is given) receive encoded bytes, large values being encoded
+        in chunks. Returns the number of characters or bytes written.
+
+        >>> buffer = io.BytesIO()
+        >>> CompiledTemplate("a photo of a <label>").render_into(
+        ...     {"label": "dog"}, buffer
+        ... )
+        16
+        >>> buffer.getvalue()
+        b'a photo of a dog'
+        """
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            if name in values:
+                parts[index] = values[name]
+
+        if encoding is None and not isinstance(
+            writer, (io.RawIOBase, io.BufferedIOBase)
+        ):
+            for part in parts:
+                writer.write(part)
+            return sum(map(len, parts))
+
+        # one stateful encoder, so BOMs (utf-16, utf-8-sig) are written once
+        encoder = codecs.getincrementalencoder(encoding or "utf-8")()
+        written = 0
+        for part in parts:
+            for start in range(0, len(part), ENCODE_CHUNK_SIZE):
+                data = encoder.encode(part[start : start + ENCODE_CHUNK_SIZE])
+                if data:
+                    written += _write_all(writer, data)
+        data = encoder.encode("", final=True)
+        if data:
+            written += _write_all(writer, data)
+        return written
+
+    def partial(self, values: Mapping[str, str]) -> "CompiledTemplate":
+        """
+        Copy of this template with the slots in `values` folded into literals.
+
+        Bound values are inserted as plain text, so they are never parsed for
+        slots, and only the remaining slots are filled when rendering.
+
+        >>> template = CompiledTemplate("<greeting>, <name>!").partial(
+        ...     {"greeting": "Hello <name>"}
+        ... )
+        >>> template.variables
+        ('name',)
+        >>> template.render({"name": "world"})
+        'Hello <name>, world!'
+        """
+        slot_names = dict(self._slots)
+        parts: list[str] = []
+        slots: list[tuple[int, str]] = []
+        literal: list[str] = []
+        for index, part in enumerate(self._parts):
+            name = slot_names.get(index)
+            if name is None:
+                literal.append(part)
+            elif name in values:
+                literal.append(values[name])
+            else:
+                if literal:
+                    parts.append("".join(literal))
+                    literal = []
+                slots.append((len(parts), name))
+                parts.append(part)
+        if literal:
+            parts.append("".join(literal))
+
+        template = CompiledTemplate.__new__(CompiledTemplate)
+        template.source = "".join(parts)
+        template.variables = tuple(dict.fromkeys(name for _, name in slots))
+        template.names = frozenset(template.variables)
+        template._parts = parts
+        template._slots = tuple(slots)
+        return template
+
+    def render_columns(
+        self, columns: Mapping[str, Sequence[str]], n_rows: int
+    ) -> list[str]:
+        """
+        Render one prompt per row, taking each variable from a column.
+
+        Consecutive literal segments are merged once, and each row is then a
+        single join over the literal runs and the row's column values.
+
+        >>> template = CompiledTemplate("<label>/<superclass>")
+        >>> template.render_columns(
+        ...     {"label": ["dog", "shirt"], "superclass": ["animal", "clothes"]}, 2
+        ... )
+        ['dog/animal', 'shirt/clothes']
+        """
+        slot_names = dict(self._slots)
+        streams: list = []
+        literal: list[str] = []
+        for index, part in enumerate(self._parts):
+            name = slot_names.get(index)
+            if name is not None and name in columns:
+                if literal:
+                    streams.append(repeat("".join(literal)))
+                    literal = []
+                streams.append(columns[name])
+            else:
+                literal.append(part)
+
+        if len(streams) == 0:
+            return ["".join(literal)] * n_rows
+        if literal:
+            streams.append(repeat("".join(literal)))
+        if len(streams) == 1:
+            return list(streams[0])
+        return list(map("".join, zip(*streams)))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.source!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile `source`, reusing the compiled form of recently seen templates."""
+    return CompiledTemplate(source)
+
+
+def _write_all(writer: IO, data: bytes) -> int:
+    """Write all of `data`, retrying the partial writes of raw streams."""
+    view = memoryview(data)
+    while view:
+        n = writer.write(view)
+        if n is None:
+            if isinstance(writer, io.RawIOBase):
+                # non-blocking raw stream that could not take any data
+                raise BlockingIOError("Writer is not ready for more data")
+            # buffered and custom writers take everything
+            break
+        view = view[n:]
+    return len(data)
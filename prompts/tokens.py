@@ -0,0 +1,64 @@
+import re
+from typing import Mapping, Protocol
+
+# GPT-2 style pre-tokenization: contractions, words, short digit runs,
+# punctuation runs and whitespace, each keeping its leading space.
+PIECE_PATTERN = re.compile(
+    r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+"""
+)
+
+# ChatML framing tokens added to every message, and to messages with a name
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+
+
+class Tokenizer(Protocol):
+    def count(self, text: str) -> int: ...
+
+
+class SimpleTokenizer:
+    """
+    Offline approximation of BPE token counts, with no dependencies.
+
+    Text is split like GPT-2's pre-tokenizer, and each piece counts as one
+    token for every `chars_per_token` characters it has (ignoring its leading
+    space), which is close to real counts for English text.
+
+    >>> SimpleTokenizer().count("Hello, world!")
+    4
+    """
+
+    def __init__(self, chars_per_token: int = 6):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        size = self.chars_per_token
+        return sum(
+            max(1, -(-len(piece.lstrip(" ")) // size))
+            for piece in PIECE_PATTERN.findall(text)
+        )
+
+
+class TiktokenTokenizer:
+    """Exact OpenAI token counts, using the optional `tiktoken` package."""
+
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        import tiktoken
+
+        self.encoding = tiktoken.encoding_for_model(model)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+default_tokenizer = SimpleTokenizer()
+
+
+def count_message_tokens(message: Mapping[str, str], tokenizer: Tokenizer) -> int:
+    """Count the tokens a ChatML message takes in the model context."""
+    n_tokens = TOKENS_PER_MESSAGE + tokenizer.count(message["content"])
+    n_tokens += tokenizer.count(message["role"])
+    name = message.get("name")
+    if name is not None:
+        n_tokens += TOKENS_PER_NAME + tokenizer.count(name)
+    return n_tokens
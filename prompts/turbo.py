@@ -1,9 +1,17 @@
-import copy
-
-import yaml
+from types import MappingProxyType
+from typing import Iterable, Mapping
 
+from . import metrics
+from .cache import content_hash, initial_messages_cache, schema_cache
 from .dynamic import DynamicPrompt
-from .exceptions import TemplateNotInPromptError
+from .exceptions import ContextLengthExceededError, TemplateNotInPromptError
+from .messages import (
+    FrozenMessage,
+    Message,
+    MessageHistory,
+    message_tokens,
+    to_chatml,
+)
 from .schemas import (
     ChatMLMessage,
     OpenAIModelSettings,
@@ -12,11 +20,224 @@ from .schemas import (
     TemplateInputs,
     TurboSchema,
 )
+from .tokens import Tokenizer, default_tokenizer
+from .utils import load_yaml
 
 TEMPLATE_TYPE = list[Template] | DynamicPrompt | str | None
 
+# role (str or PromptRole) -> the shared PromptRole value string
+_ROLE_VALUES = {
+    **{role.value: role.value for role in PromptRole},
+    **{role: role.value for role in PromptRole},
+}
+
+
+class _MessagesMixin:
+    """
+    Conversation methods shared by `TurboPrompt` and `TurboConversation`.
+
+    Expects `prompts`, `pinned_messages`, the role template dicts,
+    `default_template`, `tokenizer` and `name`.
+    """
+
+    __slots__ = ()
+
+    def add_user_message(
+        self,
+        name: str | None = None,
+        template_name: str | None = None,
+        **kwargs,
+    ):
+        self._add_message(PromptRole.USER, name, template_name, kwargs)
+
+    def add_system_message(
+        self,
+        name: str | None = None,
+        template_name: str | None = None,
+        **kwargs,
+    ):
+        self._add_message(PromptRole.SYSTEM, name, template_name, kwargs)
+
+    def add_assistant_message(
+        self,
+        name: str | None = None,
+        template_name: str | None = None,
+        **kwargs,
+    ):
+        self._add_message(PromptRole.ASSISTANT, name, template_name, kwargs)
+
+    def _add_message(
+        self,
+        role: PromptRole,
+        name: str | None,
+        template_name: str | None,
+        kwargs: dict[str, str],
+    ):
+        if metrics.sink is not None:
+            metrics.observe(
+                f"turbo.add_{role.value}_message",
+                self.name,
+                self._render_message,
+                role,
+                name,
+                template_name,
+                kwargs,
+                size=len,
+            )
+        else:
+            self._render_message(role, name, template_name, kwargs)
+
+    def _render_message(
+        self,
+        role: PromptRole,
+        name: str | None,
+        template_name: str | None,
+        kwargs: dict[str, str],
+    ) -> str:
+        if template_name is None:
+            template_name = self.default_template
+
+        templates = {
+            PromptRole.USER: self.user_prompt,
+            PromptRole.SYSTEM: self.system_prompt,
+            PromptRole.ASSISTANT: self.assistant_prompt,
+        }[role]
+        try:
+            template = templates[template_name]
+        except KeyError:
+            raise TemplateNotInPromptError(f"Template {template_name} not found")
+
+        if type(template).build is DynamicPrompt.build:
+            # uninstrumented, the whole call is already observed as one operation
+            kwargs = dict(kwargs)
+            strict = kwargs.pop("strict", True)
+            prompt = template._build(strict, kwargs)
+        else:
+            prompt = template.build(**kwargs)
+        self._add_prompt(
+            prompt_type=role,
+            prompt=prompt,
+            name=name,
+        )
+        return prompt
+
+    def _add_prompt(
+        self,
+        prompt_type: PromptRole,
+        prompt: str,
+        name: str | None = None,
+    ):
+        self.prompts.append(Message(prompt_type.value, prompt, name))
+
+    def build(
+        self,
+        mutable: bool = False,
+        max_context_tokens: int | None = None,
+        **_,
+    ) -> list[dict[str, str]]:
+        """
+        Return the conversation as a list of ChatML messages.
+
+        Messages are stored as compact `Message` objects and turned into
+        read-only dicts the first time they are built, later builds reuse
+        them; use `mutable=True` for fresh editable dicts. To read
+        the history without building it, iterate `self.prompts` directly.
+
+        With `max_context_tokens`, the oldest turns are dropped until the
+        messages fit. System messages and the initial (few-shot) messages are
+        always kept. Token counts are cached per message, so each call only
+        tokenizes the messages added since the last one.
+        """
+        if metrics.sink is not None:
+            messages = metrics.observe(
+                "turbo.build",
+                self.name,
+                self._select_messages,
+                max_context_tokens,
+                size=_content_size,
+            )
+        else:
+            messages = self._select_messages(max_context_tokens)
+
+        cls = dict if mutable else FrozenMessage
+        return [to_chatml(message, cls) for message in messages]
+
+    def _select_messages(self, max_context_tokens: int | None) -> list[dict[str, str]]:
+        if max_context_tokens is None:
+            return list(self.prompts)
+        return self._fit_messages(max_context_tokens)
+
+    def count_tokens(self) -> int:
+        """Count the tokens of the whole conversation with `self.tokenizer`."""
+        return sum(message_tokens(message, self.tokenizer) for message in self.prompts)
+
+    def _fit_messages(self, max_context_tokens: int) -> list[dict[str, str]]:
+        messages = list(self.prompts)
+        counts = [message_tokens(message, self.tokenizer) for message in messages]
+        keep = [
+            i < self.pinned_messages or message["role"] == PromptRole.SYSTEM.value
+            for i, message in enumerate(messages)
+        ]
+
+        budget = max_context_tokens - sum(
+            n_tokens for n_tokens, pinned in zip(counts, keep) if pinned
+        )
+        if budget < 0:
+            raise ContextLengthExceededError(
+                f"System and initial messages need {max_context_tokens - budget} "
+                f"tokens, more than max_context_tokens={max_context_tokens}."
+            )
+
+        for i in reversed(range(len(messages))):
+            if keep[i]:
+                continue
+            if counts[i] > budget:
+                if i == len(messages) - 1:
+                    raise ContextLengthExceededError(
+                        f"The last message needs {counts[i]} tokens, but only "
+                        f"{budget} are left of max_context_tokens={max_context_tokens}."
+                    )
+                break
+            budget -= counts[i]
+            keep[i] = True
+
+        return [message for message, kept in zip(messages, keep) if kept]
+
+    def add_raw_content(
+        self, content_item: dict | ChatMLMessage, trusted: bool = False
+    ):
+        """
+        Add a ChatML message as-is.
+
+        Dicts are validated as `ChatMLMessage` unless `trusted` is set, for
+        messages that were already validated (e.g. read back from our own
+        store): those are stored directly, skipping pydantic.
+        """
+        if trusted and isinstance(content_item, dict):
+            self.prompts.append(
+                Message(
+                    _ROLE_VALUES[content_item["role"]],
+                    content_item["content"],
+                    content_item.get("name"),
+                )
+            )
+            return
+
+        if isinstance(content_item, dict):
+            content_item = ChatMLMessage(**content_item)
+
+        self._add_prompt(
+            prompt_type=content_item.role,
+            prompt=content_item.content,
+            name=content_item.name,
+        )
 
-class TurboPrompt:
+    def clear(self):
+        self.prompts.clear()
+        self.pinned_messages = 0
+
+
+class TurboPrompt(_MessagesMixin):
     def __init__(
         self,
         system_templates: TEMPLATE_TYPE = None,
@@ -25,6 +246,7 @@ class TurboPrompt:
         settings: OpenAIModelSettings | dict | None = None,
         name: str = "",
         description: str | None = None,
+        tokenizer: Tokenizer | None = None,
     ):
         self.default_template = "default"
         if isinstance(settings, dict):
@@ -38,7 +260,12 @@ class TurboPrompt:
         self.name = name
         self.description = description
 
-        self.prompts = []
+        self.prompts = MessageHistory()
+        # leading few-shot messages kept when truncating to a token budget
+        self.pinned_messages = 0
+        self.tokenizer: Tokenizer = tokenizer or default_tokenizer
+        # content hash of the schema this prompt was created from, if any
+        self.schema_hash: bytes | None = None
 
     def __format_prompt_template(
         self, template: TEMPLATE_TYPE
@@ -74,102 +301,84 @@ class TurboPrompt:
             template = DynamicPrompt(template)
         self.assistant_prompt[template_name] = template
 
-    def add_user_message(
-        self,
-        name: str | None = None,
-        template_name: str | None = None,
-        **kwargs,
-    ):
-        if template_name is None:
-            template_name = self.default_template
-
-        try:
-            prompt = self.user_prompt[template_name].build(**kwargs)
-        except KeyError:
-            raise TemplateNotInPromptError(f"Template {template_name} not found")
-
-        self._add_prompt(
-            prompt_type=PromptRole.USER,
-            prompt=prompt,
-            name=name,
-        )
-
-    def add_system_message(
-        self,
-        name: str | None = None,
-        template_name: str | None = None,
-        **kwargs,
-    ):
-        if template_name is None:
-            template_name = self.default_template
-
-        try:
-            prompt = self.system_prompt[template_name].build(**kwargs)
-        except KeyError:
-            raise TemplateNotInPromptError(f"Template{template_name} not found")
-
-        self._add_prompt(
-            prompt_type=PromptRole.SYSTEM,
-            prompt=prompt,
-            name=name,
-        )
-
-    def add_assistant_message(
-        self,
-        name: str | None = None,
-        template_name: str | None = None,
-        **kwargs,
-    ):
-        if template_name is None:
-            template_name = self.default_template
-
-        try:
-            prompt = self.assistant_prompt[template_name].build(**kwargs)
-        except KeyError:
-            raise TemplateNotInPromptError(f"Template {template_name} not found")
-
-        self._add_prompt(
-            prompt_type=PromptRole.ASSISTANT,
-            prompt=prompt,
-            name=name,
+    def fork(self) -> "TurboPrompt":
+        """
+        Return a copy of this conversation that shares its message history.
+
+        The forked prompt only stores the messages added to it afterwards,
+        and neither prompt sees messages the other adds. Template dicts are
+        copied, while templates and settings are shared.
+        """
+        forked = self.__class__.__new__(self.__class__)
+        forked.__dict__.update(self.__dict__)
+        forked.system_prompt = dict(self.system_prompt)
+        forked.user_prompt = dict(self.user_prompt)
+        forked.assistant_prompt = dict(self.assistant_prompt)
+        forked.prompts = self.prompts.fork()
+        return forked
+
+    def to_templates(self) -> "TurboTemplates":
+        """
+        Freeze the templates, settings and current messages of this prompt.
+
+        The result can be shared by any number of threads, each starting its
+        own `TurboConversation` from it.
+        """
+        return TurboTemplates(
+            system_prompt=self.system_prompt,
+            user_prompt=self.user_prompt,
+            assistant_prompt=self.assistant_prompt,
+            settings=self.settings,
+            name=self.name,
+            description=self.description,
+            tokenizer=self.tokenizer,
+            default_template=self.default_template,
+            initial_messages=self.prompts,
+            pinned_messages=self.pinned_messages,
+            schema_hash=self.schema_hash,
         )
 
-    def _add_prompt(
-        self,
-        prompt_type: PromptRole,
-        prompt: str,
-        name: str | None = None,
-    ):
-        prompt_message = {
-            "role": prompt_type.value,
-            "content": prompt,
-        }
-        if name is not None:
-            prompt_message["name"] = name
-        self.prompts.append(prompt_message)
-
-    def build(self, **_) -> list[dict[str, str]]:
-        return copy.deepcopy(self.prompts)
-
-    def add_raw_content(self, content_item: dict | ChatMLMessage):
-        if isinstance(content_item, dict):
-            content_item = ChatMLMessage(**content_item)
-
-        self._add_prompt(
-            prompt_type=content_item.role,
-            prompt=content_item.content,
-            name=content_item.name,
-        )
+    def partial(self, **kwargs) -> "TurboPrompt":
+        """
+        Return a fork whose templates have the given variables bound.
+
+        Each template binds the variables it uses and ignores the others, so
+        new messages only fill the per-request variables.
+
+        Example:
+        ```
+            python_prompt = prompt.partial(language="python")
+            python_prompt.add_user_message(source_code=code)
+        ```
+        """
+        specialized = self.fork()
+        # the templates no longer match the schema
+        specialized.schema_hash = None
+        for templates in (
+            specialized.system_prompt,
+            specialized.user_prompt,
+            specialized.assistant_prompt,
+        ):
+            for template_name, template in templates.items():
+                templates[template_name] = template.partial(strict=False, **kwargs)
+        return specialized
 
-    def clear(self):
-        self.prompts.clear()
+    @classmethod
+    def from_turbo_schema(cls, prompt_schema: TurboSchema, hash_schema: bool = True):
+        """
+        Without `hash_schema`, the schema is not serialized to compute
+        `schema_hash`: initial messages are rendered for this prompt instead
+        of shared, and snapshots store them.
+        """
+        schema_hash = content_hash(prompt_schema) if hash_schema else None
+        return cls._from_turbo_schema(prompt_schema, schema_hash)
 
     @classmethod
-    def from_turbo_schema(cls, prompt_schema: TurboSchema):
+    def _from_turbo_schema(cls, prompt_schema: TurboSchema, schema_hash: bytes | None):
         turbo_prompt = cls(
             name=prompt_schema.name,
             description=prompt_schema.description,
-            settings=prompt_schema.settings,
+            settings=prompt_schema.settings.model_copy(),
         )
 
         turbo_prompt.add_template(
@@ -179,9 +388,27 @@ class TurboPrompt:
         turbo_prompt.add_template(
             prompt_schema.assistant_templates, type=PromptRole.ASSISTANT
         )
-        turbo_prompt.add_initial_template_data(
-            turbo_prompt, prompt_schema.initial_template_data
-        )
+
+        if schema_hash is None:
+            turbo_prompt.add_initial_template_data(
+                turbo_prompt, prompt_schema.initial_template_data
+            )
+            turbo_prompt.pinned_messages = len(turbo_prompt.prompts)
+            return turbo_prompt
+
+        # Initial messages only depend on the schema, so render them once and
+        # let every new prompt share them.
+        turbo_prompt.schema_hash = schema_hash
+        key = (cls, turbo_prompt.schema_hash)
+        initial_messages = initial_messages_cache.get(key)
+        if initial_messages is None:
+            turbo_prompt.add_initial_template_data(
+                turbo_prompt, prompt_schema.initial_template_data
+            )
+            initial_messages = MessageHistory(turbo_prompt.prompts)
+            initial_messages_cache.put(key, initial_messages)
+        turbo_prompt.prompts = initial_messages.fork()
+        turbo_prompt.pinned_messages = len(initial_messages)
 
         return turbo_prompt
 
@@ -239,10 +466,21 @@ class TurboPrompt:
                 )
 
     @classmethod
-    def from_file(cls, file_path: str):
-        with open(file_path, "r") as f:
-            prompt_data = yaml.safe_load(f)
+    def from_file(cls, file_path: str, cache: bool = True):
+        if metrics.sink is not None:
+            return metrics.observe(
+                "turbo.from_file", str(file_path), cls._from_file, file_path, cache
+            )
+        return cls._from_file(file_path, cache)
+
+    @classmethod
+    def _from_file(cls, file_path: str, cache: bool):
+        if cache:
+            # the cache owns its schemas, so it can keep their hashes
+            schema, schema_hash = schema_cache.load_hashed(file_path, TurboSchema)
+            return cls._from_turbo_schema(schema, schema_hash)
 
+        prompt_data = load_yaml(file_path)
         tb = TurboSchema(**prompt_data)
         return cls.from_turbo_schema(tb)
 
@@ -256,8 +494,16 @@ class TurboPrompt:
         system_template: list[Template] | str = "",
         user_template: list[Template] | str = "",
         assistant_template: list[Template] | str = "",
+        trusted: bool = False,
     ):
-        tbs = TurboSchema(
+        """
+        With `trusted`, the schema is assembled without pydantic validation,
+        so arguments must already have the schema's types (`settings` an
+        `OpenAIModelSettings`, `Template` lists, `TemplateInputs` or
+        `ChatMLMessage` items). The schema is not hashed either: the prompt
+        has no `schema_hash` and does not share its initial messages.
+        """
+        schema_fields = dict(
             name=name,
             description=description,
             system_templates=system_template,
@@ -266,6 +512,10 @@ class TurboPrompt:
             initial_template_data=initial_template_data,
             settings=settings,
         )
+        if trusted:
+            tbs = TurboSchema.model_construct(**schema_fields)
+            return cls.from_turbo_schema(tbs, hash_schema=False)
+        tbs = TurboSchema(**schema_fields)
         return cls.from_turbo_schema(tbs)
 
     def to_dynamic(self) -> DynamicPrompt:
@@ -289,3 +539,207 @@ class TurboPrompt:
             template="\n".join(prompts),
             template_vars=list(template_vars) or None,
         )
+
+
+class TurboTemplates:
+    """
+    Immutable template set of a `TurboPrompt`, shareable across threads.
+
+    Holds everything that does not change during a conversation: templates,
+    settings, tokenizer and initial (few-shot) messages. Each request starts
+    a `TurboConversation` from it, which only stores its own messages, so
+    threads render against one template set without locks or copies.
+
+    >>> templates = TurboPrompt(user_templates="Q: <message>").to_templates()
+    >>> conversation = templates.conversation()
+    >>> conversation.add_user_message(message="2+2?")
+    >>> conversation.build()
+    [{'role': 'user', 'content': 'Q: 2+2?'}]
+    """
+
+    __slots__ = (
+        "system_prompt",
+        "user_prompt",
+        "assistant_prompt",
+        "settings",
+        "name",
+        "description",
+        "tokenizer",
+        "default_template",
+        "pinned_messages",
+        "schema_hash",
+        "_initial_messages",
+    )
+
+    def __init__(
+        self,
+        system_prompt: Mapping[str, DynamicPrompt],
+        user_prompt: Mapping[str, DynamicPrompt],
+        assistant_prompt: Mapping[str, DynamicPrompt],
+        settings: OpenAIModelSettings | None = None,
+        name: str = "",
+        description: str | None = None,
+        tokenizer: Tokenizer | None = None,
+        default_template: str = "default",
+        initial_messages: Iterable[Message] = (),
+        pinned_messages: int = 0,
+        schema_hash: bytes | None = None,
+    ):
+        """
+        Template dicts are copied, the templates themselves are shared and
+        must not be modified.
+        """
+        init = super().__setattr__
+        init("system_prompt", MappingProxyType(dict(system_prompt)))
+        init("user_prompt", MappingProxyType(dict(user_prompt)))
+        init("assistant_prompt", MappingProxyType(dict(assistant_prompt)))
+        init("settings", settings)
+        init("name", name)
+        init("description", description)
+        init("tokenizer", tokenizer or default_tokenizer)
+        init("default_template", default_template)
+        init("pinned_messages", pinned_messages)
+        init("schema_hash", schema_hash)
+        # never appended to, conversations fork it
+        init("_initial_messages", MessageHistory(initial_messages).fork())
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    @property
+    def initial_messages(self) -> tuple[Message, ...]:
+        return tuple(self._initial_messages)
+
+    def conversation(self) -> "TurboConversation":
+        """Start a conversation with the initial messages."""
+        return TurboConversation(self)
+
+    def partial(self, **kwargs) -> "TurboTemplates":
+        """Template set with the given variables bound, see `TurboPrompt.partial`."""
+        return TurboTemplates(
+            **{
+                role: {
+                    template_name: template.partial(strict=False, **kwargs)
+                    for template_name, template in getattr(self, role).items()
+                }
+                for role in ("system_prompt", "user_prompt", "assistant_prompt")
+            },
+            settings=self.settings,
+            name=self.name,
+            description=self.description,
+            tokenizer=self.tokenizer,
+            default_template=self.default_template,
+            initial_messages=self._initial_messages,
+            pinned_messages=self.pinned_messages,
+        )
+
+    @classmethod
+    def from_file(cls, file_path: str, cache: bool = True) -> "TurboTemplates":
+        return TurboPrompt.from_file(file_path, cache).to_templates()
+
+    @classmethod
+    def from_turbo_schema(cls, prompt_schema: TurboSchema) -> "TurboTemplates":
+        return TurboPrompt.from_turbo_schema(prompt_schema).to_templates()
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (
+                dict(self.system_prompt),
+                dict(self.user_prompt),
+                dict(self.assistant_prompt),
+                self.settings,
+                self.name,
+                self.description,
+                self.tokenizer,
+                self.default_template,
+                list(self._initial_messages),
+                self.pinned_messages,
+                self.schema_hash,
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r})"
+
+
+class TurboConversation(_MessagesMixin):
+    """
+    Per-request conversation against a shared `TurboTemplates`.
+
+    Has the message methods of `TurboPrompt` (`add_user_message`, `build`,
+    `count_tokens`, ...) but only stores its own messages.
+    """
+
+    __slots__ = ("templates", "prompts", "pinned_messages")
+
+    def __init__(self, templates: TurboTemplates):
+        self.templates = templates
+        self.prompts = templates._initial_messages.fork()
+        self.pinned_messages = templates.pinned_messages
+
+    @property
+    def system_prompt(self) -> Mapping[str, DynamicPrompt]:
+        return self.templates.system_prompt
+
+    @property
+    def user_prompt(self) -> Mapping[str, DynamicPrompt]:
+        return self.templates.user_prompt
+
+    @property
+    def assistant_prompt(self) -> Mapping[str, DynamicPrompt]:
+        return self.templates.assistant_prompt
+
+    @property
+    def default_template(self) -> str:
+        return self.templates.default_template
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        return self.templates.tokenizer
+
+    @property
+    def settings(self) -> OpenAIModelSettings | None:
+        return self.templates.settings
+
+    @property
+    def name(self) -> str:
+        return self.templates.name
+
+    @property
+    def schema_hash(self) -> bytes | None:
+        return self.templates.schema_hash
+
+    def fork(self) -> "TurboConversation":
+        """Copy of this conversation sharing its history, see `TurboPrompt.fork`."""
+        forked = TurboConversation.__new__(TurboConversation)
+        forked.templates = self.templates
+        forked.prompts = self.prompts.fork()
+        forked.pinned_messages = self.pinned_messages
+        return forked
+
+    def __reduce__(self):
+        return (
+            _restore_conversation,
+            (self.templates, list(self.prompts), self.pinned_messages),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(templates={self.templates.name!r}, "
+            f"messages={len(self.prompts)})"
+        )
+
+
+def _restore_conversation(
+    templates: TurboTemplates, messages: list[Message], pinned_messages: int
+) -> TurboConversation:
+    conversation = TurboConversation.__new__(TurboConversation)
+    conversation.templates = templates
+    conversation.prompts = MessageHistory(messages)
+    conversation.pinned_messages = pinned_messages
+    return conversation
+
+
+def _content_size(messages: list[dict[str, str]]) -> int:
+    return sum(len(message["content"]) for message in messages)
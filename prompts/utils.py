@@ -1,9 +1,29 @@
+import os
+from pathlib import Path
 from typing import Any
 
-import yaml
+PROMPT_FILE_PATTERNS = ("*.yaml", "*.yml")
 
 
 def load_yaml(filename: str) -> dict[str, Any]:
+    import yaml
+
     with open(filename) as f:
-        prompt = yaml.safe_load(f)
+        prompt = yaml.load(f, Loader=yaml_safe_loader())
     return prompt
+
+
+def yaml_safe_loader() -> type:
+    """libyaml's `CSafeLoader` when PyYAML was built with it, else `SafeLoader`."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def find_prompt_files(directory: str | os.PathLike) -> list[Path]:
+    """Prompt files anywhere under `directory`, in sorted order."""
+    return sorted(
+        path
+        for pattern in PROMPT_FILE_PATTERNS
+        for path in Path(directory).rglob(pattern)
+    )
@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from prompts import DynamicPrompt, TurboPrompt, exceptions
+from prompts.aio import abuild, abuild_many
+from prompts.ensemble import PromptEnsemble
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_abuild_dynamic_keeps_order():
+    prompt = DynamicPrompt("a photo of a <label>")
+    labels = ["dog", "cat", "horse", "bird", "fish"]
+
+    async def source():
+        for label in labels:
+            yield {"label": label}
+
+    result = asyncio.run(collect(abuild(prompt, source(), concurrency=2)))
+    assert result == [f"a photo of a {label}" for label in labels]
+
+
+def test_abuild_backpressure():
+    prompt = DynamicPrompt("<label>")
+    pulled = []
+
+    async def source():
+        for i in range(10):
+            pulled.append(i)
+            yield {"label": str(i)}
+
+    async def take_two():
+        stream = abuild(prompt, source(), concurrency=3)
+        first = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(take_two()) == ["0", "1"]
+    assert len(pulled) == 4
+
+
+def test_abuild_ensemble_offload():
+    ensemble = PromptEnsemble(["<label>", "a photo of <label>"], ["label"])
+    inputs = [{"label": ["dog", "cat"]}, {"label": "horse"}]
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stream = abuild(ensemble, inputs, executor=executor, offload_threshold=4)
+            return await collect(stream)
+
+    assert asyncio.run(run()) == [
+        ["dog", "a photo of dog", "cat", "a photo of cat"],
+        ["horse", "a photo of horse"],
+    ]
+
+    result = asyncio.run(abuild_many(ensemble, label=["dog"]))
+    assert result == ["dog", "a photo of dog"]
+
+
+def test_abuild_turbo_and_errors():
+    tp = TurboPrompt.from_file("samples/turbo.prompt.yaml")
+    inputs = [{"user_name": "Qui-gon", "message": "Hey!"}]
+
+    result = asyncio.run(collect(abuild(tp, inputs)))
+    assert result == [[{"role": "user", "content": "Qui-gon: Hey!\n"}]]
+    assert len(tp.prompts) == 0
+
+    templates = tp.to_templates()
+    assert asyncio.run(collect(abuild(templates, inputs))) == result
+
+    with pytest.raises(exceptions.TemplateNotInPromptError):
+        asyncio.run(collect(abuild(tp, [{"template_name": "missing"}])))
@@ -0,0 +1,51 @@
+import shutil
+
+import pytest
+
+from prompts import DynamicPrompt, DynamicSchema, TurboPrompt, exceptions
+from prompts.bundle import PromptBundle, build_bundle
+
+
+def test_bundle_roundtrip(tmp_path):
+    bundle_file = tmp_path / "prompts.bundle"
+    n_prompts = build_bundle("samples", bundle_file)
+    assert n_prompts == 4
+
+    with PromptBundle(bundle_file) as bundle:
+        assert len(bundle) == 4
+        assert "basic_turbo_prompt" in bundle
+        assert bundle.kind("Sample prompt") == "dynamic"
+
+        schema = bundle.schema("Sample prompt")
+        assert isinstance(schema, DynamicSchema)
+        assert bundle.schema("Sample prompt") is schema
+
+        prompt = bundle["Sample prompt"]
+        assert isinstance(prompt, DynamicPrompt)
+        expected = DynamicPrompt.from_file("samples/sample.prompt.yaml")
+        assert prompt.build(input_sentence="hi") == expected.build(input_sentence="hi")
+
+        first = bundle.load("turbo_prompt_with_examples")
+        second = bundle.load("turbo_prompt_with_examples")
+        assert isinstance(first, TurboPrompt)
+        first.add_user_message(source_code="print('hi')")
+        assert len(first.prompts) == 4
+        assert (
+            second.build() == TurboPrompt.from_file("samples/sample.past.yaml").build()
+        )
+
+
+def test_bundle_duplicate_names(tmp_path):
+    shutil.copy("samples/turbo.prompt.yaml", tmp_path / "a.yaml")
+    shutil.copy("samples/turbo.prompt.yaml", tmp_path / "b.yaml")
+
+    with pytest.raises(exceptions.DuplicatePromptNameError):
+        build_bundle(tmp_path, tmp_path / "prompts.bundle")
+
+
+def test_bundle_bad_file(tmp_path):
+    bundle_file = tmp_path / "prompts.bundle"
+    bundle_file.write_bytes(b"not a bundle" * 10)
+
+    with pytest.raises(ValueError):
+        PromptBundle(bundle_file)
@@ -0,0 +1,63 @@
+import os
+import shutil
+
+from prompts import DynamicPrompt, DynamicSchema, TurboPrompt, TurboSchema
+from prompts.cache import SchemaCache, content_hash, schema_cache
+
+
+def test_schema_cache_hits_and_invalidation(tmp_path):
+    prompt_file = tmp_path / "sample.prompt.yaml"
+    shutil.copy("samples/sample.prompt.yaml", prompt_file)
+    cache = SchemaCache()
+
+    schema = cache.load(prompt_file, DynamicSchema)
+    assert cache.load(prompt_file, DynamicSchema) is schema
+    assert cache.stats()[:3] == (1, 1, 0)
+
+    prompt_file.write_text(
+        "name: changed\ntemplate: <input_sentence>!\nsettings:\n  model: gpt-4\n"
+    )
+    stat = prompt_file.stat()
+    os.utime(prompt_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    changed = cache.load(prompt_file, DynamicSchema)
+    assert changed.name == "changed"
+    assert cache.stats().misses == 2
+
+
+def test_schema_cache_eviction(tmp_path):
+    cache = SchemaCache(maxsize=1)
+    for i in range(3):
+        prompt_file = tmp_path / f"{i}.prompt.yaml"
+        shutil.copy("samples/sample.prompt.yaml", prompt_file)
+        cache.load(prompt_file, DynamicSchema)
+
+    stats = cache.stats()
+    assert stats.size == 1
+    assert stats.evictions == 2
+
+
+def test_from_file_returns_fresh_prompts():
+    schema_cache.clear()
+    first = TurboPrompt.from_file("samples/sample.past.yaml")
+    second = TurboPrompt.from_file("samples/sample.past.yaml")
+    assert schema_cache.stats().hits == 1
+
+    first.add_user_message(source_code="print('hi')")
+    assert len(first.prompts) == 4
+    assert len(second.prompts) == 3
+    assert first.settings is not second.settings
+
+    prompt = DynamicPrompt.from_file("samples/sample.prompt.yaml")
+    uncached = DynamicPrompt.from_file("samples/sample.prompt.yaml", cache=False)
+    assert prompt.build(input_sentence="hi") == uncached.build(input_sentence="hi")
+
+
+def test_schema_cache_hashes():
+    cache = SchemaCache()
+    schema, digest = cache.load_hashed("samples/sample.past.yaml", TurboSchema)
+    assert digest == content_hash(schema)
+
+    cached = cache.load_hashed("samples/sample.past.yaml", TurboSchema)
+    assert cached == (schema, digest)
+    assert cache.stats()[:2] == (1, 1)
@@ -0,0 +1,111 @@
+import hashlib
+
+import pytest
+
+from prompts.embeddings import EmbeddingCache, EnsembleEncoder
+from prompts.ensemble import PromptEnsemble
+
+np = pytest.importorskip("numpy")
+
+
+class HashEncoder:
+    """Deterministic stand-in for a text encoder, recording its batches."""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.batches = []
+
+    def __call__(self, batch: list[str]):
+        self.batches.append(list(batch))
+        return np.array([self.embed(prompt) for prompt in batch])
+
+    def embed(self, prompt: str):
+        seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim)
+
+
+def test_ensemble_encoder():
+    templates = ["<label>", "<label>", "a photo of <label>"]
+    ensemble = PromptEnsemble(templates, ["label"])
+    encoder = HashEncoder()
+    stage = EnsembleEncoder(ensemble, encoder, batch_size=3)
+
+    labels = ["dog", "cat", "dog", "horse"]
+    embeddings = stage.encode(label=labels)
+    assert embeddings.shape == (4, 8)
+
+    expected = np.array(
+        [
+            np.mean([encoder.embed(p) for p in ensemble.build(label=label)], axis=0)
+            for label in labels
+        ]
+    )
+    np.testing.assert_allclose(embeddings, expected)
+
+    # 6 distinct prompts, encoded once each in batches of 3
+    assert [len(batch) for batch in encoder.batches] == [3, 3]
+
+    # cached prompts are not encoded again
+    stage.encode(label=["cat", "zebra"])
+    assert encoder.batches[2:] == [["zebra", "a photo of zebra"]]
+
+
+def test_ensemble_encoder_chunks(monkeypatch):
+    ensemble = PromptEnsemble(["<label>", "a photo of <label>"], ["label"])
+    labels = ["dog", "cat", "dog", "horse", "cat"]
+    expected = EnsembleEncoder(ensemble, HashEncoder()).encode(label=labels)
+
+    chunk_rows = []
+    build_grid = ensemble.build_grid
+
+    def record_chunk(**kwargs):
+        chunk_rows.append(len(kwargs["label"]))
+        return build_grid(**kwargs)
+
+    monkeypatch.setattr(ensemble, "build_grid", record_chunk)
+    encoder = HashEncoder()
+    stage = EnsembleEncoder(ensemble, encoder, chunk_size=2)
+    np.testing.assert_allclose(stage.encode(label=labels), expected)
+    assert chunk_rows == [2, 2, 1]
+    # prompts seen in earlier chunks come from the cache
+    assert sum(map(len, encoder.batches)) == 6
+
+
+def test_ensemble_encoder_normalize():
+    ensemble = PromptEnsemble(["<label>", "a photo of <label>"], ["label"])
+    stage = EnsembleEncoder(ensemble, HashEncoder(), normalize=True)
+    embeddings = stage.encode(label=["dog", "cat"])
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0])
+
+
+def test_ensemble_encoder_errors():
+    ensemble = PromptEnsemble(["<label>"], ["label"])
+    with pytest.raises(ValueError):
+        EnsembleEncoder(ensemble, HashEncoder(), batch_size=0)
+    with pytest.raises(ValueError):
+        EnsembleEncoder(ensemble, HashEncoder(), chunk_size=0)
+
+    stage = EnsembleEncoder(ensemble, lambda batch: np.zeros((1, 2)))
+    with pytest.raises(ValueError):
+        stage.encode(label=["dog", "cat"])
+
+    assert stage.encode(label=[]).shape == (0, 0)
+
+
+def test_embedding_cache_disk(tmp_path):
+    path = tmp_path / "embeddings"
+    encoder = HashEncoder()
+    ensemble = PromptEnsemble(["<label>"], ["label"])
+
+    with EmbeddingCache(maxsize=1, path=path) as cache:
+        stage = EnsembleEncoder(ensemble, encoder, cache=cache)
+        first = stage.encode(label=["dog", "cat"])
+        assert len(cache) == 1
+        # "dog" was evicted from memory but is read back from disk
+        np.testing.assert_allclose(stage.encode(label=["dog"]), first[:1])
+    assert len(encoder.batches) == 1
+
+    with EmbeddingCache(path=path) as cache:
+        stage = EnsembleEncoder(ensemble, encoder, cache=cache)
+        np.testing.assert_allclose(stage.encode(label=["dog", "cat"]), first)
+    assert len(encoder.batches) == 1
@@ -139,3 +139,157 @@ def test_prompt_ensemble_from_file():
     prompt_ens_ff = PromptEnsemble.from_paths([prompt_file, prompt_file, prompt_file])
     prompt_ff = prompt_ens_ff.build(input_sentence="lets go")
     assert prompt_ff == prompt_str
+
+
+def test_iter_many():
+    templates = ["<label>", "a photo of <label>"]
+    template_vars = ["label"]
+    classes = ["dog", "cat", "horse"]
+
+    prompt = PromptEnsemble(templates, template_vars)
+
+    prompted_iter = prompt.iter_many(label=classes)
+    assert next(prompted_iter) == "dog"
+    assert list(prompted_iter) == prompt.build_many(label=classes)[1:]
+
+    chunks = list(prompt.iter_many(chunk_size=4, label=classes))
+    assert chunks == [
+        ["dog", "a photo of dog", "cat", "a photo of cat"],
+        ["horse", "a photo of horse"],
+    ]
+
+    with pytest.raises(exceptions.ArgumentNumberOfElementsError):
+        prompt.iter_many(label=classes, superclass=["animal"])
+
+    with pytest.raises(ValueError):
+        prompt.iter_many(chunk_size=0, label=classes)
+
+
+def test_build_grid():
+    np = pytest.importorskip("numpy")
+
+    templates = ["<label>/<superclass>", "a photo of <label>"]
+    template_vars = ["label", "superclass"]
+    labels = np.array(["dog", "cat", "t-shirt"])
+    superclasses = ("animal", "animal", "clothes")
+
+    prompt = PromptEnsemble(templates, template_vars)
+
+    grid = prompt.build_grid(label=labels, superclass=superclasses)
+    assert grid.shape == (3, 2)
+    assert grid[0] == ["dog/animal", "a photo of dog"]
+    assert grid[2, 0] == "t-shirt/clothes"
+    assert grid[:, 1] == ["a photo of dog", "a photo of cat", "a photo of t-shirt"]
+    assert grid[1:].tolist() == [
+        ["cat/animal", "a photo of cat"],
+        ["t-shirt/clothes", "a photo of t-shirt"],
+    ]
+    assert grid.ravel() == prompt.build_many(
+        label=list(labels), superclass=list(superclasses)
+    )
+
+    array = grid.to_numpy()
+    assert array.shape == (3, 2)
+    assert array[1, 1] == "a photo of cat"
+
+    with pytest.raises(exceptions.UndefinedVariableError):
+        prompt.build_grid(label=labels, superclass=superclasses, strict=True)
+
+    with pytest.raises(exceptions.ArgumentNumberOfElementsError):
+        prompt.build_grid(label=labels, superclass=superclasses[:-1])
+
+
+def test_build_many_workers():
+    templates = ["<label>/<superclass>", "a photo of <label>"]
+    template_vars = ["label", "superclass"]
+    labels = [f"label{i}" for i in range(50)]
+    superclasses = [f"superclass{i}" for i in range(50)]
+
+    prompt = PromptEnsemble(templates, template_vars)
+    expected = prompt.build_many(label=labels, superclass=superclasses)
+
+    prompt.parallel_threshold = 10
+    prompt.workers = 2
+    prompted_list = prompt.build_many(label=labels, superclass=superclasses)
+    assert prompted_list == expected
+
+    # `workers` is not an argument, so it can name a template variable
+    prompt = PromptEnsemble(["<workers> of <label>"], ["workers", "label"])
+    assert prompt.build_many(label=["a"], workers=["b"]) == ["b of a"]
+
+
+def test_build_unique():
+    templates = ["<label>", "<label>", "a photo of <label>"]
+    template_vars = ["label"]
+    labels = ["dog", "cat", "dog"]
+
+    prompt = PromptEnsemble(templates, template_vars)
+
+    unique, index = prompt.build_unique(label=labels)
+    assert unique == ["dog", "a photo of dog", "cat", "a photo of cat"]
+    assert index == [[0, 0, 1], [2, 2, 3], [0, 0, 1]]
+
+    flat = [unique[i] for row in index for i in row]
+    assert flat == prompt.build_many(label=labels)
+
+    assert prompt.build_unique(label=[]) == ([], [])
+
+
+def test_build_product():
+    import itertools
+
+    templates = ["<style> of <label>/<superclass>", "a <style> of <label>"]
+    prompt = PromptEnsemble(templates, ["label", "superclass", "style"])
+    labels = ["dog", "cat", "t-shirt"]
+    superclasses = ("animal", "clothes")
+    styles = iter(["photo", "drawing"])
+
+    product = prompt.build_product(label=labels, superclass=superclasses, style=styles)
+    combinations = list(itertools.product(labels, superclasses, ["photo", "drawing"]))
+    expected = prompt.build_many(
+        label=[c[0] for c in combinations],
+        superclass=[c[1] for c in combinations],
+        style=[c[2] for c in combinations],
+    )
+    assert len(product) == 24 == len(expected)
+    assert list(product) == expected
+    assert [product[i] for i in range(-24, 24)] == expected * 2
+    assert list(product[5:17:3]) == expected[5:17:3]
+    assert list(product[5:17][2:][::-1]) == expected[5:17][2:][::-1]
+    assert product.row(3) == {
+        "label": "dog",
+        "superclass": "clothes",
+        "style": "drawing",
+    }
+
+    shards = [product.shard(i, 5) for i in range(5)]
+    assert [len(shard) for shard in shards] == [4, 5, 5, 5, 5]
+    assert [p for shard in shards for p in shard] == expected
+
+    with pytest.raises(IndexError):
+        product[24]
+    with pytest.raises(ValueError):
+        product.shard(5, 5)
+
+    numbers = [str(i) for i in range(10_000)]
+    huge = prompt.build_product(label=numbers, superclass=numbers, style=["photo"])
+    assert len(huge) == 2 * 10**8
+    assert huge[-1] == "a photo of 9999"
+    assert list(huge.shard(10**8 - 1, 10**8)) == [
+        "photo of 9999/9999",
+        "a photo of 9999",
+    ]
+
+    assert len(prompt.build_product(label=labels, superclass=[])) == 0
+
+
+def test_build_many_custom_prompt_class():
+    class UpperPrompt(DynamicPrompt):
+        def build(self, strict=True, **kwargs):
+            return super().build(strict=strict, **kwargs).upper()
+
+    prompt = PromptEnsemble(["a <label>"], ["label"], prompt_class=UpperPrompt)
+    assert prompt.build(label="b") == ["A B"]
+    assert prompt.build_many(label=["b", "c"]) == ["A B", "A C"]
+    assert prompt.build_grid(label=["b", "c"])[:, 0] == ["A B", "A C"]
+    assert list(prompt.iter_many(label=["b", "c"])) == ["A B", "A C"]
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+# `import prompts` used to pull in pydantic and PyYAML (~250ms); keep it well
+# below that. The best of a few runs is used to absorb noise on busy machines.
+IMPORT_TIME_BUDGET = 0.1
+RUNS = 3
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import prompts
+prompt = prompts.DynamicPrompt("a photo of a <label>")
+prompt.build(label="dog")
+elapsed = time.perf_counter() - start
+heavy = sorted(
+    name for name in sys.modules if name.split(".")[0] in ("pydantic", "yaml")
+)
+print(json.dumps({"elapsed": elapsed, "heavy": heavy}))
+"""
+
+
+def run_import() -> dict:
+    output = subprocess.check_output([sys.executable, "-c", SCRIPT], text=True)
+    return json.loads(output)
+
+
+def test_import_is_lazy():
+    result = run_import()
+    assert result["heavy"] == []
+
+
+def test_import_time_budget():
+    elapsed = min(run_import()["elapsed"] for _ in range(RUNS))
+    assert elapsed < IMPORT_TIME_BUDGET
+
+
+def test_lazy_attributes():
+    import prompts
+
+    assert prompts.TurboPrompt.__name__ == "TurboPrompt"
+    assert prompts.exceptions.PromptError.__name__ == "PromptError"
+    assert "DynamicPrompt" in dir(prompts)
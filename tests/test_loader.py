@@ -0,0 +1,67 @@
+import shutil
+
+from prompts import DynamicPrompt, TurboPrompt, loader
+from prompts.loader import load_prompts
+
+
+def make_prompt_dir(tmp_path):
+    shutil.copytree("samples", tmp_path / "samples")
+    (tmp_path / "samples" / "broken.yaml").write_text("name: [unclosed\n")
+    (tmp_path / "samples" / "invalid.yml").write_text("name: invalid\ntemplate: 3\n")
+    shutil.copy("samples/sample.prompt.yaml", tmp_path / "samples" / "z_duplicate.yaml")
+    return tmp_path / "samples"
+
+
+def test_load_prompts(tmp_path):
+    directory = make_prompt_dir(tmp_path)
+    result = load_prompts(directory, workers=1)
+
+    assert sorted(result.prompts) == sorted(
+        [
+            "Sample prompt",
+            "basic_turbo_prompt",
+            "turbo_prompt_with_examples",
+            "all_the_turbo_features",
+        ]
+    )
+    prompt = result.prompts["Sample prompt"]
+    assert isinstance(prompt, DynamicPrompt)
+    assert result.sources["Sample prompt"].endswith("sample.prompt.yaml")
+    expected = TurboPrompt.from_file("samples/complex.yaml").build()
+    assert result.prompts["all_the_turbo_features"].build() == expected
+
+    errors = {error.path.rsplit("/", 1)[-1]: error for error in result.errors}
+    assert sorted(errors) == ["broken.yaml", "invalid.yml", "z_duplicate.yaml"]
+    assert errors["broken.yaml"].stage == "parse"
+    assert errors["invalid.yml"].stage == "validate"
+    assert errors["invalid.yml"].error == "ValidationError"
+    assert errors["z_duplicate.yaml"].error == "DuplicatePromptNameError"
+
+    assert set(result.timings) == {
+        "discover",
+        "read",
+        "parse",
+        "validate",
+        "build",
+        "total",
+    }
+    assert result.timings["total"] >= result.timings["discover"]
+
+    globbed = load_prompts(str(directory / "**" / "*.prompt.yaml"), workers=1)
+    assert sorted(globbed.prompts) == ["Sample prompt", "basic_turbo_prompt"]
+    assert globbed.errors == []
+
+    listed = load_prompts([directory / "complex.yaml"])
+    assert list(listed.prompts) == ["all_the_turbo_features"]
+
+
+def test_load_prompts_parallel(tmp_path, monkeypatch):
+    directory = make_prompt_dir(tmp_path)
+    monkeypatch.setattr(loader, "PARALLEL_THRESHOLD", 2)
+
+    parallel = load_prompts(directory, workers=2)
+    sequential = load_prompts(directory, workers=1)
+    assert parallel.sources == sequential.sources
+    assert parallel.errors == sequential.errors
+    for name, prompt in sequential.prompts.items():
+        assert type(parallel.prompts[name]) is type(prompt)
@@ -0,0 +1,66 @@
+import pytest
+
+from prompts import DynamicPrompt, TurboPrompt, exceptions, metrics
+from prompts.ensemble import PromptEnsemble
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.InMemoryRegistry()
+    metrics.set_sink(registry)
+    yield registry
+    metrics.set_sink(None)
+
+
+def test_dynamic_metrics(registry):
+    prompt = DynamicPrompt("a photo of a <label>", name="photo")
+    prompt.build(label="dog")
+    prompt.build(label="horse")
+    with pytest.raises(exceptions.UndefinedVariableError):
+        prompt.build(animal="cat")
+
+    stats = registry.get("dynamic.build", "photo")
+    assert stats.calls == 3
+    assert stats.errors == 1
+    assert stats.strict_failures == 1
+    assert stats.rendered_chars == len("a photo of a dog") + len("a photo of a horse")
+    assert sum(stats.buckets) == 3
+
+
+def test_ensemble_and_turbo_metrics(registry):
+    ensemble = PromptEnsemble(["<label>", "a photo of <label>"], ["label"], name="ens")
+    ensemble.build_many(label=["dog", "cat"])
+    assert registry.get("ensemble.build_many", "ens").rendered_chars == 34
+
+    tp = TurboPrompt.from_file("samples/turbo.prompt.yaml")
+    tp.add_user_message(user_name="Qui-gon", message="Hey!")
+    tp.build()
+    assert registry.get("turbo.from_file", "samples/turbo.prompt.yaml").calls == 1
+    assert registry.get("turbo.add_user_message", "basic_turbo_prompt").calls == 1
+    assert registry.get("turbo.build", "basic_turbo_prompt").rendered_chars == 14
+    # messages are rendered without recording a template build of their own
+    assert ("dynamic.build", "") not in dict(registry.items())
+
+
+def test_prometheus_export(registry):
+    DynamicPrompt("<label>", name='say "hi"').build(label="dog")
+
+    text = metrics.to_prometheus(registry)
+    labels = 'operation="dynamic.build",name="say \\"hi\\""'
+    assert f"prompts_calls_total{{{labels}}} 1" in text
+    assert f'prompts_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert text.count("# TYPE") == 5
+
+
+def test_disabled_by_default(monkeypatch):
+    assert metrics.sink is None
+
+    def observe(*args, **kwargs):
+        raise AssertionError("metrics recorded without a sink")
+
+    monkeypatch.setattr(metrics, "observe", observe)
+    assert DynamicPrompt("<label>", name="photo").build(label="dog") == "dog"
+    PromptEnsemble(["<label>"], ["label"]).build_many(label=["dog"])
+    tp = TurboPrompt.from_file("samples/turbo.prompt.yaml")
+    tp.add_user_message(user_name="Qui-gon", message="Hey!")
+    tp.build()
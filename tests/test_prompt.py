@@ -50,3 +50,91 @@ class TestPrompt:
         filled_prompt = prompt.build(
             strict=False, img_label='dog', animal='mamal')
         assert filled_prompt == 'a photo of a dog'
+
+    @staticmethod
+    def test_template_vars_derived():
+        prompt = DynamicPrompt("<greeting>, <name>! <name>?")
+        assert prompt.template_vars == ["greeting", "name"]
+        assert prompt.build(greeting="hi", name="bob") == "hi, bob! bob?"
+
+    @staticmethod
+    def test_values_are_not_substituted_again():
+        prompt = DynamicPrompt("<first> and <second>")
+        filled_prompt = prompt.build(first="<second>", second="two")
+        assert filled_prompt == "<second> and two"
+
+    @staticmethod
+    def test_missing_vars_are_kept():
+        prompt = DynamicPrompt("<first> and <second>")
+        assert prompt.build(first="one") == "one and <second>"
+
+    @staticmethod
+    def test_template_reassignment():
+        prompt = DynamicPrompt(TestPrompt.template)
+        prompt.template = "picture of <img_label>"
+        assert prompt.build(img_label="dog") == "picture of dog"
+
+    @staticmethod
+    def test_partial():
+        prompt = DynamicPrompt("<persona>: <text> (<language>)", name="translate")
+        french = prompt.partial(persona="<bot>", language="French")
+        assert french.template_vars == ["text"]
+        assert french.name == "translate"
+        assert french.build(text="hello") == "<bot>: hello (French)"
+        assert prompt.build(persona="a", text="b", language="c") == "a: b (c)"
+
+        with pytest.raises(exceptions.UndefinedVariableError):
+            french.build(language="German")
+        with pytest.raises(exceptions.UndefinedVariableError):
+            prompt.partial(animal="dog")
+        assert prompt.partial(strict=False, animal="dog").template == prompt.template
+
+    @staticmethod
+    def test_render_into(tmp_path):
+        import io
+
+        prompt = DynamicPrompt("Code to check:\n<source_code>\n-- <author>")
+        source_code = "print('olá')\n" * 10_000
+        expected = prompt.build(source_code=source_code, author="me")
+
+        text = io.StringIO()
+        written = prompt.render_into(text, source_code=source_code, author="me")
+        assert text.getvalue() == expected
+        assert written == len(expected)
+
+        binary = io.BytesIO()
+        written = prompt.render_into(binary, source_code=source_code, author="me")
+        assert binary.getvalue() == expected.encode()
+        assert written == len(expected.encode())
+
+        path = tmp_path / "prompt.txt"
+        with open(path, "wb") as f:
+            prompt.render_into(f, encoding="latin-1", author="me")
+        assert path.read_bytes() == b"Code to check:\n<source_code>\n-- me"
+
+        for encoding in ("utf-16", "utf-8-sig"):
+            binary = io.BytesIO()
+            prompt.render_into(
+                binary, encoding=encoding, source_code=source_code, author="me"
+            )
+            assert binary.getvalue().decode(encoding) == expected
+
+        class ShortWriter(io.RawIOBase):
+            # raw streams such as sockets may take only part of each write
+            def __init__(self):
+                self.data = bytearray()
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                self.data += data[:1000]
+                return min(len(data), 1000)
+
+        raw = ShortWriter()
+        written = prompt.render_into(raw, source_code=source_code, author="me")
+        assert bytes(raw.data) == expected.encode()
+        assert written == len(expected.encode())
+
+        with pytest.raises(exceptions.UndefinedVariableError):
+            prompt.render_into(io.StringIO(), language="python")
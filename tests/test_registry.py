@@ -0,0 +1,91 @@
+import os
+import shutil
+import threading
+
+from prompts import DynamicPrompt, TurboPrompt, exceptions
+from prompts.registry import PromptRegistry
+
+
+def touch(path, content):
+    """Write `content` and make sure the modification time changes."""
+    stat = path.stat() if path.exists() else None
+    path.write_text(content)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+
+def dynamic_prompt(name, template):
+    return f"name: {name}\ntemplate: {template}\nsettings:\n  model: gpt-4\n"
+
+
+def test_registry_reload(tmp_path):
+    shutil.copy("samples/turbo.prompt.yaml", tmp_path / "turbo.yaml")
+    touch(tmp_path / "photo.yaml", dynamic_prompt("photo", "a photo of <label>"))
+
+    registry = PromptRegistry(tmp_path)
+    assert sorted(registry) == ["basic_turbo_prompt", "photo"]
+    assert isinstance(registry["basic_turbo_prompt"], TurboPrompt)
+    assert registry["photo"].build(label="dog") == "a photo of dog"
+
+    snapshot = registry.snapshot
+    assert registry.refresh() is False
+    assert registry.snapshot is snapshot
+
+    touch(tmp_path / "photo.yaml", dynamic_prompt("photo", "picture of <label>"))
+    assert registry.refresh() is True
+    assert registry["photo"].build(label="dog") == "picture of dog"
+    # readers holding the old snapshot keep a consistent view
+    assert snapshot["photo"].build(label="dog") == "a photo of dog"
+    assert registry.snapshot.generation == snapshot.generation + 1
+
+    (tmp_path / "turbo.yaml").unlink()
+    registry.refresh()
+    assert list(registry) == ["photo"]
+
+
+def test_registry_errors(tmp_path):
+    photo = tmp_path / "photo.yaml"
+    touch(photo, dynamic_prompt("photo", "a photo of <label>"))
+    registry = PromptRegistry(tmp_path)
+
+    # a broken edit keeps the last good version published
+    touch(photo, "name: photo\ntemplate: [unclosed\n")
+    registry.refresh()
+    assert registry["photo"].build(label="dog") == "a photo of dog"
+    assert list(registry.snapshot.errors) == [photo]
+
+    # a second file with the same name does not take over
+    touch(photo, dynamic_prompt("photo", "picture of <label>"))
+    touch(tmp_path / "a_copy.yaml", dynamic_prompt("photo", "copy of <label>"))
+    registry.refresh()
+    assert registry["photo"].build(label="dog") == "picture of dog"
+    errors = registry.snapshot.errors
+    assert isinstance(errors[tmp_path / "a_copy.yaml"], exceptions.PromptError)
+
+    photo.unlink()
+    registry.refresh()
+    assert registry["photo"].build(label="dog") == "copy of dog"
+    assert registry.snapshot.errors == {}
+
+
+def test_registry_background_reload(tmp_path):
+    photo = tmp_path / "photo.yaml"
+    touch(photo, dynamic_prompt("photo", "a photo of <label>"))
+
+    with PromptRegistry(tmp_path) as registry:
+        reloaded = threading.Event()
+        refresh = registry.refresh
+
+        def refresh_and_notify():
+            changed = refresh()
+            if changed:
+                reloaded.set()
+            return changed
+
+        registry.refresh = refresh_and_notify
+        registry.start(interval=0.01)
+        touch(photo, dynamic_prompt("photo", "picture of <label>"))
+        assert reloaded.wait(timeout=5)
+        assert isinstance(registry["photo"], DynamicPrompt)
+        assert registry["photo"].build(label="dog") == "picture of dog"
+    assert registry._thread is None
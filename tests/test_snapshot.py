@@ -0,0 +1,95 @@
+import pytest
+
+from prompts import TurboPrompt, exceptions
+from prompts.registry import PromptRegistry
+from prompts.snapshot import dump_delta, dump_snapshot, restore
+
+
+def make_conversation():
+    tp = TurboPrompt.from_file("samples/complex.yaml")
+    tp.add_user_message(source_code="print(1)", name="Qui-gon")
+    tp.add_assistant_message(
+        template_name="assistant_super_prompt", prediction="Looks fine ✓"
+    )
+    return tp
+
+
+def test_snapshot_roundtrip():
+    tp = make_conversation()
+    data = dump_snapshot(tp)
+    # the three initial messages come from the schema
+    assert b"sum_numbers" not in data
+
+    restored = restore(data, TurboPrompt.from_file("samples/complex.yaml"))
+    assert restored.build() == tp.build()
+    assert restored.pinned_messages == tp.pinned_messages
+    assert restored.build(max_context_tokens=200) == tp.build(max_context_tokens=200)
+
+    templates = TurboPrompt.from_file("samples/complex.yaml").to_templates()
+    assert restore(data, templates).build() == tp.build()
+
+
+def test_snapshot_deltas():
+    tp = make_conversation()
+    data = dump_snapshot(tp)
+    for i in range(3):
+        saved = len(tp.prompts)
+        tp.add_user_message(source_code=f"print({i})")
+        tp.add_raw_content({"role": "system", "content": "be brief"})
+        data += dump_delta(tp, since=saved)
+
+    source = TurboPrompt.from_file("samples/complex.yaml")
+    restored = restore(data, source)
+    assert restored.build() == tp.build()
+    assert len(source.prompts) == 3
+
+    # restoring continues the conversation
+    restored.add_user_message(source_code="print(4)")
+    assert len(restored.prompts) == len(tp.prompts) + 1
+
+    stale = dump_delta(tp, since=len(tp.prompts) - 1)
+    with pytest.raises(ValueError):
+        restore(dump_snapshot(make_conversation()) + stale, source)
+    with pytest.raises(ValueError):
+        dump_delta(tp, since=len(tp.prompts) + 1)
+
+
+def test_snapshot_schema_mismatch(tmp_path):
+    data = dump_snapshot(make_conversation())
+
+    with pytest.raises(exceptions.SchemaMismatchError):
+        restore(data, TurboPrompt.from_file("samples/turbo.prompt.yaml"))
+
+    changed = tmp_path / "complex.yaml"
+    changed.write_text(
+        open("samples/complex.yaml").read().replace("product", "difference")
+    )
+    with pytest.raises(exceptions.SchemaMismatchError):
+        restore(data, TurboPrompt.from_file(str(changed)))
+
+    registry = PromptRegistry("samples")
+    assert restore(data, registry).build() == make_conversation().build()
+    with pytest.raises(exceptions.SchemaMismatchError):
+        restore(data, {})
+    with pytest.raises(ValueError):
+        restore(b"not a snapshot", registry)
+
+
+def test_snapshot_without_schema():
+    tp = TurboPrompt(user_templates="Q: <message>", name="inline")
+    tp.add_user_message(message="2+2?")
+    tp.add_assistant_message(message="4")
+
+    restored = restore(dump_snapshot(tp), TurboPrompt(name="inline"))
+    assert restored.build() == tp.build()
+
+
+def test_snapshot_truncated():
+    tp = make_conversation()
+    data = dump_snapshot(tp)
+    source = TurboPrompt.from_file("samples/complex.yaml")
+
+    # every cut lands in a name, frame header, record header or message
+    for size in range(1, len(data)):
+        with pytest.raises(ValueError):
+            restore(data[:size], source)
@@ -1,10 +1,17 @@
+import pickle
+
+import pytest
+
 from prompts import (
     DynamicPrompt,
     OpenAIModelSettings,
     PromptRole,
     TemplateInputs,
     TurboPrompt,
+    TurboSchema,
+    exceptions,
 )
+from prompts.messages import MessageHistory
 
 
 def test_turbo_all_none():
@@ -163,3 +170,290 @@ def test_a_from_settings():
         "role": "system",
         "content": "You are an AI.",
     }
+
+
+def test_build_read_only_messages():
+    tp = TurboPrompt()
+    tp.add_system_message(message="You are a chatbot")
+    tp.add_user_message(message="Hi", name="Qui-gon")
+
+    first = tp.build()
+    second = tp.build()
+    assert first == [
+        {"role": "system", "content": "You are a chatbot"},
+        {"role": "user", "content": "Hi", "name": "Qui-gon"},
+    ]
+    assert first == second
+    # stored messages are only turned into dicts once
+    assert all(a is b for a, b in zip(first, second))
+    assert tp.fork().build()[1] is first[1]
+    with pytest.raises(TypeError):
+        first[0]["content"] = "changed"
+
+    tp.add_assistant_message(message="Hello")
+    assert len(first) == 2
+
+    mutable = tp.build(mutable=True)
+    mutable[0]["content"] = "changed"
+    assert tp.build()[0]["content"] == "You are a chatbot"
+
+
+def test_fork_shares_history():
+    tp = TurboPrompt.from_file("samples/sample.past.yaml")
+    branches = [tp.fork() for _ in range(3)]
+    for i, branch in enumerate(branches):
+        branch.add_user_message(source_code=f"print({i})")
+
+    tp.add_assistant_message(prediction="nothing to fix")
+
+    assert len(tp.prompts) == 4
+    assert tp.prompts[-1]["role"] == "assistant"
+    for i, branch in enumerate(branches):
+        built = branch.build()
+        assert len(built) == 4
+        assert built[:3] == tp.build()[:3]
+        assert branch.prompts[0] is tp.prompts[0]
+        assert f"print({i})" in built[-1]["content"]
+
+    nested = branches[0].fork()
+    nested.add_assistant_message(prediction="looks good")
+    branches[0].clear()
+    assert len(branches[0].prompts) == 0
+    assert [message["role"] for message in nested.build()] == [
+        "system",
+        "user",
+        "assistant",
+        "user",
+        "assistant",
+    ]
+
+    nested.add_user_template("short", "<source_code>")
+    assert "short" not in tp.user_prompt
+
+
+def test_fork_chain():
+    history = MessageHistory(["system"])
+    for i in range(3000):
+        previous, history = history, history.fork()
+        history.append(f"turn {i}")
+
+    # a fork links to the chain of its parent instead of copying it
+    assert history._parent[3] is previous._parent
+    assert len(history) == 3001
+    assert history[0] == "system"
+    assert history[1500] == "turn 1499"
+    assert history[-1] == "turn 2999"
+    assert list(history)[-2:] == ["turn 2998", "turn 2999"]
+    assert pickle.loads(pickle.dumps(history)) == history
+
+
+def test_initial_messages_rendered_once(monkeypatch):
+    first = TurboPrompt.from_file("samples/sample.past.yaml")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("initial messages should not be rendered again")
+
+    monkeypatch.setattr(TurboPrompt, "add_initial_template_data", fail)
+    second = TurboPrompt.from_file("samples/sample.past.yaml", cache=False)
+
+    assert second.build() == first.build()
+    assert second.prompts[0] is first.prompts[0]
+
+    second.add_user_message(source_code="print('hi')")
+    assert len(first.prompts) == 3
+    assert len(second.prompts) == 4
+
+
+def test_initial_messages_follow_schema_changes():
+    schema = TurboSchema(
+        name="changing",
+        settings=OpenAIModelSettings(model="gpt-4"),
+        system_templates="<message>",
+        user_templates="<message>",
+        assistant_templates="<message>",
+        initial_template_data=[
+            TemplateInputs(inputs={"message": "A"}, role=PromptRole.SYSTEM)
+        ],
+    )
+    assert TurboPrompt.from_turbo_schema(schema).build()[0]["content"] == "A"
+
+    schema.initial_template_data[0]["inputs"]["message"] = "B"
+    assert TurboPrompt.from_turbo_schema(schema).build()[0]["content"] == "B"
+
+
+class WordTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return len(text.split())
+
+
+def test_build_max_context_tokens():
+    from prompts.exceptions import ContextLengthExceededError
+    from prompts.tokens import SimpleTokenizer
+
+    assert SimpleTokenizer().count("may the force be with you") == 6
+
+    tp = TurboPrompt.from_file("samples/sample.past.yaml")
+    tp.tokenizer = WordTokenizer()
+    for i in range(5):
+        tp.add_user_message(source_code=f"print({i})")
+        tp.add_assistant_message(prediction=f"fixed {i}")
+
+    full = tp.build()
+    assert len(full) == 13
+    assert tp.count_tokens() == 139
+
+    # few-shot messages take 49 tokens, later ones 10 (user) or 8 (assistant)
+    built = tp.build(max_context_tokens=100)
+    assert built[:3] == full[:3]
+    assert built[3:] == full[-5:]
+
+    # counts are cached on the messages, new turns only tokenize new messages
+    calls = tp.tokenizer.calls
+    tp.add_user_message(source_code="print(5)")
+    tp.build(max_context_tokens=100)
+    assert tp.tokenizer.calls - calls == 2
+
+    with pytest.raises(ContextLengthExceededError):
+        tp.build(max_context_tokens=50)
+
+    tp.add_system_message(language="python")
+    built = tp.build(max_context_tokens=100)
+    assert built[-1]["role"] == "system"
+
+
+def test_compact_message_storage():
+    import pickle
+    import sys
+
+    tp = TurboPrompt()
+    tp.add_user_message(message="Hi")
+    tp.add_raw_content({"role": "user", "content": "Hello", "name": "Qui-gon"})
+
+    message = tp.prompts[0]
+    assert not hasattr(message, "__dict__")
+    assert sys.getsizeof(message) < sys.getsizeof({"role": "user", "content": "Hi"})
+    assert message.role is tp.prompts[1].role is PromptRole.USER.value
+    assert message == {"role": "user", "content": "Hi"}
+    assert tp.prompts[1]["name"] == "Qui-gon"
+    assert "name" not in message
+
+    restored = pickle.loads(pickle.dumps(tp))
+    assert restored.build() == tp.build()
+
+
+def test_trusted_fast_path():
+    raw = [
+        {"role": "system", "content": "You are an AI."},
+        {"role": "user", "content": "Hello", "name": "Qui-gon"},
+        {"role": PromptRole.ASSISTANT, "content": "Hi"},
+    ]
+    validated = TurboPrompt()
+    trusted = TurboPrompt()
+    for message in raw:
+        validated.add_raw_content(message)
+        trusted.add_raw_content(message, trusted=True)
+    assert trusted.build() == validated.build()
+    assert trusted.prompts[2].role == "assistant"
+
+    settings = dict(
+        name="turbo_prompt_inline",
+        description="",
+        system_template="<message>",
+        user_template="Q:<message>",
+        assistant_template="A:",
+        settings=OpenAIModelSettings(model="gpt-4"),
+        initial_template_data=[
+            TemplateInputs(inputs={"message": "You are an AI."}, role=PromptRole.SYSTEM)
+        ],
+    )
+    validated = TurboPrompt.from_settings(**settings)
+    trusted = TurboPrompt.from_settings(**settings, trusted=True)
+    assert trusted.build() == validated.build()
+    assert trusted.settings == validated.settings
+    assert trusted.pinned_messages == validated.pinned_messages == 1
+    assert trusted.schema_hash is None
+    trusted.add_user_message(message="2+2?")
+    assert trusted.build()[-1]["content"] == "Q:2+2?"
+
+
+def test_partial():
+    tp = TurboPrompt.from_file("samples/complex.yaml")
+    rust = tp.partial(language="rust")
+
+    rust.add_system_message(template_name="sys_prompt")
+    assert "Language: rust" in rust.build()[-1]["content"]
+    assert rust.build()[:3] == tp.build()
+
+    rust.add_user_message(source_code="fn main() {}")
+    assert "fn main() {}" in rust.build()[-1]["content"]
+
+    with pytest.raises(exceptions.UndefinedVariableError):
+        rust.add_system_message(template_name="sys_prompt", language="go")
+
+    tp.add_system_message(template_name="sys_prompt", language="go")
+    assert len(tp.prompts) == 4
+
+
+def test_shared_templates():
+    import pickle
+    from concurrent.futures import ThreadPoolExecutor
+
+    from prompts import TurboTemplates
+
+    tp = TurboPrompt.from_file("samples/complex.yaml")
+    templates = tp.to_templates()
+    assert templates.initial_messages == tuple(tp.prompts)
+
+    with pytest.raises(AttributeError):
+        templates.name = "changed"
+    with pytest.raises(TypeError):
+        templates.user_prompt["other"] = DynamicPrompt("<x>")
+
+    # changing the original prompt does not change the frozen templates
+    tp.add_user_template("other", "other: <x>")
+    tp.add_user_message(source_code="mutated")
+    assert "other" not in templates.user_prompt
+    assert len(templates.initial_messages) == 3
+
+    def chat(i):
+        conversation = templates.conversation()
+        conversation.add_user_message(source_code=f"print({i})")
+        branch = conversation.fork()
+        branch.add_assistant_message(
+            template_name="assistant_super_prompt", prediction="ok"
+        )
+        return conversation.build(), branch.build(max_context_tokens=1000)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(chat, range(20)))
+    for i, (built, branched) in enumerate(results):
+        assert built[:3] == TurboPrompt.from_file("samples/complex.yaml").build()
+        assert f"print({i})" in built[-1]["content"]
+        assert len(built) == 4
+        assert branched[:4] == built and len(branched) == 5
+
+    conversation = templates.partial(language="go").conversation()
+    conversation.add_system_message(template_name="sys_prompt")
+    assert "Language: go" in conversation.build()[-1]["content"]
+    assert conversation.count_tokens() > 0
+
+    restored = pickle.loads(pickle.dumps(conversation))
+    assert restored.build() == conversation.build()
+    assert restored.templates.name == templates.name
+    assert TurboTemplates.from_file("samples/complex.yaml").conversation().build() == (
+        results[0][0][:3]
+    )
+
+
+def test_custom_template_class():
+    class UpperPrompt(DynamicPrompt):
+        def build(self, strict=True, **kwargs):
+            return super().build(strict=strict, **kwargs).upper()
+
+    tp = TurboPrompt(user_templates=UpperPrompt("q: <message>"))
+    tp.add_user_message(message="hi")
+    assert tp.build()[-1]["content"] == "Q: HI"